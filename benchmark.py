@@ -0,0 +1,245 @@
+"""Headless benchmarks for the render and animation pipeline.
+
+Generates synthetic PDFs (text-heavy, image-heavy, 1000+ pages and ~50 MB)
+and measures time-to-first-page, thumbnail throughput, page render time,
+per-frame flip time and peak RSS without opening a window. Each document
+is measured in its own process so peak RSS belongs to that case alone.
+
+    python benchmark.py                         # full suite
+    python benchmark.py --quick                 # smaller documents
+    python benchmark.py --output bench.json     # machine-readable results
+    python benchmark.py --baseline bench.json   # exit 1 on regressions
+"""
+import argparse
+import io
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+import fitz
+from PIL import Image
+
+from flip_engine import FlipEngine, add_page_curl_effect, apply_3d_perspective
+from render_pool import RenderPool, ThumbnailRenderEngine, render_fitted_page, render_thumbnail
+
+CANVAS_SIZES = [(1400, 800), (3840, 2160)]
+THUMB_SIZE = (110, 154)
+FRAMES = 15
+
+# name -> (generator kind, pages, quick pages)
+CASES = {
+    'text': ('text', 200, 40),
+    'images': ('images', 100, 20),
+    'long': ('text', 1200, 1000),
+    'large': ('large', 60, 12),
+}
+
+# Metrics where a bigger number is better; everything else is a cost
+HIGHER_IS_BETTER = {'thumbnails_per_sec', 'thumbnails_per_sec_pool'}
+
+def noise_jpeg(width, height, quality=90):
+    """Incompressible RGB noise, so image-heavy PDFs reach a realistic size"""
+    bands = [Image.effect_noise((width, height), 80) for _ in range(3)]
+    buffer = io.BytesIO()
+    Image.merge('RGB', bands).save(buffer, 'JPEG', quality=quality)
+    return buffer.getvalue()
+
+def generate_pdf(kind, path, pages):
+    doc = fitz.open()
+    photo = noise_jpeg(1200, 900, quality=75) if kind == 'images' else None
+    
+    for page_num in range(pages):
+        page = doc.new_page()
+        page.insert_text((50, 40), f"Page {page_num + 1}", fontsize=18)
+        
+        if kind == 'text':
+            text = f"Catalogue item {page_num} lorem ipsum dolor sit amet, consectetur adipiscing elit. " * 60
+            page.insert_textbox(fitz.Rect(50, 60, 545, 780), text, fontsize=8)
+            for i in range(40):
+                page.draw_line((50, 60 + i * 18), (545, 70 + i * 18), color=(0.6, 0.6, 0.8), width=0.3)
+        elif kind == 'images':
+            page.insert_image(fitz.Rect(50, 60, 545, 430), stream=photo)
+            page.insert_image(fitz.Rect(50, 440, 545, 800), stream=photo)
+        else:
+            # A fresh noise image per page keeps the file from deduplicating
+            page.insert_image(fitz.Rect(30, 60, 565, 800), stream=noise_jpeg(1600, 2200))
+    
+    doc.save(path, garbage=3, deflate=True)
+    doc.close()
+
+def ensure_pdf(name, quick, directory):
+    kind, pages, quick_pages = CASES[name]
+    pages = quick_pages if quick else pages
+    path = os.path.join(directory, f"bench_{name}_{pages}.pdf")
+    if not os.path.exists(path):
+        print(f"Generating {os.path.basename(path)}...", file=sys.stderr)
+        generate_pdf(kind, path, pages)
+    return path
+
+def peak_rss_mb():
+    try:
+        import resource
+    except ImportError:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / (1024 * 1024) if sys.platform == 'darwin' else peak / 1024
+
+def time_flip(page_img, previous_img):
+    """Per-frame ms for a full turn, plus the final curl overlay"""
+    frame_times = []
+    engine = FlipEngine(page_img, previous_img, 1)
+    for i in range(FRAMES):
+        start = time.perf_counter()
+        engine.to_display(apply_3d_perspective(engine, i / FRAMES))
+        frame_times.append((time.perf_counter() - start) * 1000)
+    
+    start = time.perf_counter()
+    add_page_curl_effect(page_img)
+    curl_ms = (time.perf_counter() - start) * 1000
+    return frame_times, curl_ms
+
+def run_case(path):
+    """Measure one document; runs inside its own process"""
+    results = {'file_mb': round(os.path.getsize(path) / (1024 * 1024), 2)}
+    max_width, max_height = CANVAS_SIZES[0][0] - 40, CANVAS_SIZES[0][1] - 40
+    
+    start = time.perf_counter()
+    doc = fitz.open(path)
+    first = render_fitted_page(doc[0], 1.0, max_width, max_height)
+    add_page_curl_effect(first)
+    results['time_to_first_page_ms'] = (time.perf_counter() - start) * 1000
+    results['pages'] = len(doc)
+    
+    sample = range(min(len(doc), 10))
+    start = time.perf_counter()
+    for page_num in sample:
+        render_fitted_page(doc[page_num], 1.0, max_width, max_height)
+    results['page_render_ms'] = (time.perf_counter() - start) * 1000 / len(sample)
+    
+    count = min(len(doc), 100)
+    start = time.perf_counter()
+    for page_num in range(count):
+        render_thumbnail(doc[page_num], *THUMB_SIZE)
+    results['thumbnails_per_sec'] = count / (time.perf_counter() - start)
+    
+    count = len(doc)
+    start = time.perf_counter()
+    pool = RenderPool(path)
+    engine = ThumbnailRenderEngine(pool)
+    engine.prioritize(list(range(count)), *THUMB_SIZE)
+    while engine.busy():
+        engine.poll()
+        time.sleep(0.002)
+    results['thumbnails_per_sec_pool'] = count / (time.perf_counter() - start)
+    results['pool_workers'] = pool.workers
+    pool.shutdown()
+    
+    for width, height in CANVAS_SIZES:
+        page_num = min(1, len(doc) - 1)
+        page_img = render_fitted_page(doc[page_num], 4.0, width - 40, height - 40)
+        previous = render_fitted_page(doc[0], 4.0, width - 40, height - 40)
+        frame_times, curl_ms = time_flip(page_img, previous)
+        label = f"{width}x{height}"
+        results[f'flip_frame_ms_{label}'] = statistics.mean(frame_times)
+        results[f'flip_frame_p95_ms_{label}'] = sorted(frame_times)[int(len(frame_times) * 0.95) - 1]
+        results[f'curl_ms_{label}'] = curl_ms
+    
+    results['peak_rss_mb'] = peak_rss_mb()
+    return {k: round(v, 2) if isinstance(v, float) else v for k, v in results.items()}
+
+def compare(results, baseline, threshold):
+    """List metrics that got worse than the baseline by more than threshold, and missing cases"""
+    regressions = []
+    # Cases left out with --cases are not compared; ones that were run but crashed are
+    requested = results['meta'].get('cases', list(results['cases']))
+    for name in baseline.get('cases', {}):
+        if name in requested and name not in results['cases']:
+            regressions.append(f"{name}: no results (the case failed)")
+    
+    for name, metrics in results['cases'].items():
+        old_metrics = baseline.get('cases', {}).get(name, {})
+        for metric, value in metrics.items():
+            old = old_metrics.get(metric)
+            if not isinstance(value, (int, float)) or not isinstance(old, (int, float)) or not old:
+                continue
+            if metric in ('pages', 'file_mb', 'pool_workers'):
+                continue
+            change = (value - old) / old
+            worse = change < -threshold if metric in HIGHER_IS_BETTER else change > threshold
+            if worse:
+                regressions.append(f"{name}.{metric}: {old} -> {value} ({change:+.0%})")
+    return regressions
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the flipbook render pipeline")
+    parser.add_argument('--quick', action='store_true', help="use smaller documents")
+    parser.add_argument('--cases', nargs='+', choices=sorted(CASES), default=list(CASES))
+    parser.add_argument('--pdf-dir', default=os.path.join(tempfile.gettempdir(), 'flipbook_bench'))
+    parser.add_argument('--output', help="write results as JSON to this file")
+    parser.add_argument('--baseline', help="JSON results to compare against")
+    parser.add_argument('--threshold', type=float, default=0.2, help="allowed slowdown (default 0.2)")
+    parser.add_argument('--run-case', help=argparse.SUPPRESS)
+    args = parser.parse_args()
+    
+    if args.run_case:
+        print(json.dumps(run_case(args.run_case)))
+        return 0
+    
+    os.makedirs(args.pdf_dir, exist_ok=True)
+    results = {
+        'meta': {
+            'python': platform.python_version(),
+            'pymupdf': fitz.VersionBind,
+            'platform': platform.platform(),
+            'cpu_count': os.cpu_count(),
+            'quick': args.quick,
+            'cases': args.cases,
+        },
+        'cases': {},
+        'failed': [],
+    }
+    
+    for name in args.cases:
+        path = ensure_pdf(name, args.quick, args.pdf_dir)
+        proc = subprocess.run(
+            [sys.executable, os.path.abspath(__file__), '--run-case', path],
+            capture_output=True, text=True
+        )
+        if proc.returncode != 0:
+            print(f"{name}: failed\n{proc.stderr}", file=sys.stderr)
+            results['failed'].append(name)
+            continue
+        metrics = json.loads(proc.stdout.strip().splitlines()[-1])
+        results['cases'][name] = metrics
+        
+        print(f"\n[{name}] {metrics['pages']} pages, {metrics['file_mb']} MB")
+        for metric, value in metrics.items():
+            if metric not in ('pages', 'file_mb'):
+                print(f"  {metric:<32} {value}")
+    
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(results, f, indent=2)
+    
+    if args.baseline:
+        with open(args.baseline) as f:
+            regressions = compare(results, json.load(f), args.threshold)
+        if regressions:
+            print("\nRegressions:")
+            for line in regressions:
+                print(f"  {line}")
+            return 1
+        print("\nNo regressions against baseline.")
+    
+    if results['failed']:
+        print(f"\nFailed cases: {', '.join(results['failed'])}", file=sys.stderr)
+        return 1
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,77 @@
+"""Pre-render a PDF into a flipbook bundle the viewer opens without PyMuPDF.
+
+    python build_bundle.py catalogue.pdf                     # -> catalogue.flipbook
+    python build_bundle.py catalogue.pdf --sizes 1600 3200   # sharper pyramid
+    python build_bundle.py catalogue.pdf --format WEBP       # smaller, slower to decode
+
+Pages are rendered on all cores and written as they finish; embed the
+result in the exe with: python build_exe.py --bundle catalogue.flipbook
+"""
+import argparse
+import multiprocessing
+import os
+import sys
+import time
+from concurrent.futures import FIRST_COMPLETED, wait
+
+from page_bundle import BUNDLE_EXTENSION, DEFAULT_SIZES, THUMB_SIZE, BundleWriter
+from render_pool import RenderPool, render_bundle_page_task
+from search_index import SearchIndex
+
+def build_bundle(pdf_path, output, sizes, image_format, quality, workers=None):
+    import fitz
+    with fitz.open(pdf_path) as doc:
+        page_count = len(doc)
+    
+    writer = BundleWriter(output, page_count, image_format, os.path.basename(pdf_path))
+    index = SearchIndex()
+    pool = RenderPool(pdf_path, workers=workers)
+    try:
+        # Keep only a few pages in flight so finished images do not pile up in memory
+        pending = set()
+        next_page = done = 0
+        while done < page_count:
+            while next_page < page_count and len(pending) < pool.workers * 2:
+                future = pool.submit(render_bundle_page_task, next_page, sizes, THUMB_SIZE, image_format, quality)
+                future.page_num = next_page
+                pending.add(future)
+                next_page += 1
+            
+            finished, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for future in finished:
+                width, height, levels, thumbnail, words = future.result()
+                writer.add_page(future.page_num, width, height, levels, thumbnail)
+                index.add_page(future.page_num, words)
+                done += 1
+            print(f"\r  {done}/{page_count} pages", end='', flush=True)
+        print()
+        writer.finish(index)
+    except BaseException:
+        writer.abort()
+        raise
+    finally:
+        pool.shutdown()
+
+def main():
+    parser = argparse.ArgumentParser(description="Pre-render a PDF into a flipbook bundle")
+    parser.add_argument('pdf', help="PDF to pre-render")
+    parser.add_argument('-o', '--output', help=f"bundle path (default: next to the PDF, {BUNDLE_EXTENSION})")
+    parser.add_argument('--sizes', type=int, nargs='+', default=list(DEFAULT_SIZES),
+                        help="longest side of each pyramid level in pixels (default: %(default)s)")
+    parser.add_argument('--format', choices=['JPEG', 'WEBP'], default='JPEG', help="image format (default: JPEG)")
+    parser.add_argument('--quality', type=int, default=90, help="encoder quality (default: 90)")
+    parser.add_argument('--workers', type=int, help="render processes (default: one per core, less one)")
+    args = parser.parse_args()
+    
+    output = args.output or os.path.splitext(args.pdf)[0] + BUNDLE_EXTENSION
+    print(f"Bundling {args.pdf} -> {output}")
+    start = time.perf_counter()
+    build_bundle(args.pdf, output, sorted(args.sizes), args.format, args.quality, args.workers)
+    
+    size_mb = os.path.getsize(output) / (1024 * 1024)
+    print(f"✅ Done in {time.perf_counter() - start:.1f} s ({size_mb:.1f} MB)")
+    return 0
+
+if __name__ == "__main__":
+    multiprocessing.freeze_support()
+    sys.exit(main())
@@ -1,13 +1,39 @@
 import PyInstaller.__main__
+import argparse
 import os
 import shutil
 
+parser = argparse.ArgumentParser(description="Build the PDF Flipbook Viewer executable")
+parser.add_argument(
+    '--onedir',
+    action='store_true',
+    help="build a pre-extracted folder instead of a single exe (much faster to launch)"
+)
+parser.add_argument(
+    '--bundle',
+    metavar='FILE',
+    help="embed a .flipbook bundle from build_bundle.py; the exe opens it at launch"
+)
+args = parser.parse_args()
+
+if args.bundle and not os.path.isfile(args.bundle):
+    parser.error(f"bundle not found: {args.bundle}")
+
 print("Building PDF Flipbook Viewer EXE...")
 print("=" * 50)
 
+# --onefile unpacks the whole bundle to a temp dir on every launch;
+# --onedir ships the files already extracted next to the exe
+mode = '--onedir' if args.onedir else '--onefile'
+
+extra_data = []
+if args.bundle:
+    # A onefile exe re-extracts the bundle on every launch; prefer --onedir for big ones
+    extra_data.append(f'--add-data={args.bundle}:bundles')
+
 PyInstaller.__main__.run([
     'flipbook.py',
-    '--onefile',
+    mode,
     '--windowed',
     '--name=FlipbookPDFViewer',
     '--icon=NONE',
@@ -22,15 +48,22 @@ PyInstaller.__main__.run([
     '--strip',
     '--optimize=2',
     '--clean'
-])
+] + extra_data)
 
 print("\n" + "=" * 50)
 print("✅ Build complete!")
-print("📁 EXE file location: dist/FlipbookPDFViewer.exe")
+if args.onedir:
+    print("📁 EXE file location: dist/FlipbookPDFViewer/FlipbookPDFViewer.exe")
+    print("   (ship the whole dist/FlipbookPDFViewer folder)")
+else:
+    print("📁 EXE file location: dist/FlipbookPDFViewer.exe")
 print("\nFeatures included:")
 print("✓ PDF support with thumbnails")
 print("✓ Page curl animation effect")
 print("✓ Zoom controls")
 print("✓ Fullscreen mode")
 print("✓ Export to exe button")
+if args.bundle:
+    print(f"✓ Embedded bundle: {os.path.basename(args.bundle)}")
 print("\nExpected size: 20-30 MB (includes PDF rendering library)")
+print("Time a launch with: FlipbookPDFViewer --measure-startup (exits once the window is up)")
@@ -0,0 +1,195 @@
+"""Persistent on-disk cache of rendered thumbnails and pages.
+
+Entries live in a directory named after a content hash of the PDF, so a
+catalogue is recognised however it was copied or renamed, and each file
+name encodes the page and render settings. Images are stored as JPEG,
+which decodes several times faster than WebP or PNG, and file mtimes
+double as LRU timestamps when pruning the cache back under its size cap.
+"""
+import hashlib
+import json
+import os
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from PIL import Image
+
+from render_cache import budget_from_env
+
+CACHE_VERSION = 1
+DEFAULT_CAP_MB = 512
+STALE_TEMP_SECONDS = 600  # a .tmp file this old is left over from a failed write
+
+def default_cache_dir():
+    override = os.environ.get('FLIPBOOK_DISK_CACHE_DIR')
+    if override:
+        return override
+    base = os.environ.get('LOCALAPPDATA') or os.path.join(os.path.expanduser('~'), '.cache')
+    return os.path.join(base, 'FlipbookPDFViewer', 'cache')
+
+def file_hash(path, chunk_size=1024 * 1024):
+    """Content hash of a file, read in chunks so big PDFs stay out of memory"""
+    digest = hashlib.blake2b(digest_size=16)
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(chunk_size), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+def prune_cache(root, max_bytes):
+    """Delete least recently used entries under root until they fit max_bytes"""
+    entries = []
+    total = 0
+    now = time.time()
+    for dirpath, _, filenames in os.walk(root):
+        for name in filenames:
+            is_temp = name.endswith('.tmp')
+            if not (name.startswith('v') or is_temp):
+                continue
+            path = os.path.join(dirpath, name)
+            try:
+                stat = os.stat(path)
+                if is_temp:
+                    # Other processes may still be writing the recent ones
+                    if now - stat.st_mtime > STALE_TEMP_SECONDS:
+                        os.remove(path)
+                    continue
+            except OSError:
+                continue
+            entries.append((stat.st_mtime, stat.st_size, path))
+            total += stat.st_size
+    
+    if total <= max_bytes:
+        return
+    
+    # Go a little below the cap so we do not prune on every write
+    target = max_bytes * 0.9
+    for _, size, path in sorted(entries):
+        try:
+            os.remove(path)
+            total -= size
+        except OSError:
+            pass
+        if total <= target:
+            break
+
+class DocumentCache:
+    """Encoded images for one document; safe to pickle into worker processes.
+    
+    Every copy counts its own writes and prunes the whole cache back under
+    its cap now and then, so render workers writing directly are covered
+    as well as the viewer's writer thread.
+    """
+    
+    PRUNE_EVERY = 50  # writes between pruning passes, per process
+    
+    def __init__(self, directory, root=None, max_bytes=None):
+        self.directory = directory
+        self.root = root
+        self.max_bytes = max_bytes
+        self.writes = 0
+    
+    def path_for(self, key):
+        name = '_'.join(str(part) for part in key)
+        return os.path.join(self.directory, f"v{CACHE_VERSION}_{name}.jpg")
+    
+    def get(self, key):
+        path = self.path_for(key)
+        try:
+            with Image.open(path) as img:
+                img = img.convert('RGB')
+            # Touch the file so pruning treats it as recently used
+            os.utime(path)
+            return img
+        except (OSError, ValueError):
+            return None
+    
+    def put(self, key, img):
+        """Encode and write atomically; concurrent writers of one key are harmless"""
+        quality = 85 if key[0] == 'thumb' else 90
+        temp_path = None
+        try:
+            os.makedirs(self.directory, exist_ok=True)
+            fd, temp_path = tempfile.mkstemp(dir=self.directory, suffix='.tmp')
+            with os.fdopen(fd, 'wb') as f:
+                img.save(f, 'JPEG', quality=quality)
+            os.replace(temp_path, self.path_for(key))
+        except OSError as e:
+            print(f"Disk cache write error: {e}")
+            if temp_path:
+                # Most likely a full disk, where orphans would pile up fastest
+                try:
+                    os.unlink(temp_path)
+                except OSError:
+                    pass
+            return
+        
+        self.writes += 1
+        if self.max_bytes and self.writes % self.PRUNE_EVERY == 0:
+            prune_cache(self.root, self.max_bytes)
+
+class DiskCache:
+    """Size-capped root of all document caches with background writes"""
+    
+    def __init__(self, root=None, max_bytes=None):
+        self.root = root or default_cache_dir()
+        self.max_bytes = max_bytes or budget_from_env('FLIPBOOK_DISK_CACHE_MB', DEFAULT_CAP_MB)
+        self.hash_index_path = os.path.join(self.root, 'hashes.json')
+        self.writer = ThreadPoolExecutor(max_workers=1)
+        self.writer.submit(self.prune)
+    
+    def load_hash_index(self):
+        try:
+            with open(self.hash_index_path) as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {}
+    
+    def known_document_hash(self, path):
+        """Memoized hash of an unchanged file, or None without reading it"""
+        stat = os.stat(path)
+        entry = self.load_hash_index().get(os.path.abspath(path))
+        if entry and entry[:2] == [stat.st_size, stat.st_mtime_ns]:
+            return entry[2]
+        return None
+    
+    def document_hash(self, path):
+        """Content hash of path, memoized by (size, mtime) so reopening is instant"""
+        doc_hash = self.known_document_hash(path)
+        if doc_hash:
+            return doc_hash
+        
+        stat = os.stat(path)
+        signature = [stat.st_size, stat.st_mtime_ns]
+        index = self.load_hash_index()
+        doc_hash = file_hash(path)
+        index[os.path.abspath(path)] = signature + [doc_hash]
+        try:
+            os.makedirs(self.root, exist_ok=True)
+            with open(self.hash_index_path, 'w') as f:
+                json.dump(index, f)
+        except OSError as e:
+            print(f"Disk cache index error: {e}")
+        return doc_hash
+    
+    def document_hash_async(self, path):
+        """document_hash() on the writer thread, so a new file is read off the UI thread"""
+        return self.writer.submit(self.document_hash, path)
+    
+    def document(self, doc_hash):
+        return DocumentCache(os.path.join(self.root, doc_hash), self.root, self.max_bytes)
+    
+    def put_async(self, document, key, img):
+        """Write from a background thread so encoding never blocks the UI"""
+        self.writer.submit(document.put, key, img)
+    
+    def run_async(self, fn, *args):
+        """Run other cache writes, such as the search index, on the writer thread"""
+        self.writer.submit(fn, *args)
+    
+    def prune(self):
+        """Delete least recently used entries until the cache fits its cap"""
+        prune_cache(self.root, self.max_bytes)
+    
+    def shutdown(self):
+        self.writer.shutdown(wait=True)
@@ -0,0 +1,370 @@
+"""Perspective page-flip frames built on a low-resolution proxy.
+
+The turning page is treated as a rigid sheet hinged at the spine (the left
+edge) and projected through a pinhole camera centred on the page, so each
+frame is one Image.transform(PERSPECTIVE) of a downscaled proxy pasted into
+a reused buffer. The proxy frame is blown up to display size with a cheap
+filter, since motion hides the softness; QualityGovernor trades proxy size,
+filters and frame rate against the measured frame time. Shadow and curl
+effects are pasted from cached sprites, and nothing here needs a display;
+benchmark.py times these stages headless.
+"""
+import math
+import os
+import time
+from collections import namedtuple
+from functools import lru_cache
+
+from PIL import Image, ImageDraw
+
+BACKGROUND = (139, 157, 168)
+PROXY_PIXELS = 640 * 1000
+CAMERA_DISTANCE = 4.0  # in page widths
+SHADOW_BUCKETS = 32
+
+# Animation settings from cheapest to smoothest; frame count follows from the interval
+FlipQuality = namedtuple('FlipQuality', 'name proxy_pixels resample upscale interval')
+QUALITY_TIERS = [
+    FlipQuality('low', 320 * 500, Image.Resampling.NEAREST, Image.Resampling.NEAREST, 0.05),
+    FlipQuality('medium', PROXY_PIXELS, Image.Resampling.BILINEAR, Image.Resampling.NEAREST, 0.03),
+    FlipQuality('high', 1280 * 1000, Image.Resampling.BILINEAR, Image.Resampling.BILINEAR, 1 / 60),
+]
+
+def solve_linear(a, b):
+    """Gauss-Jordan elimination with partial pivoting for small systems"""
+    n = len(b)
+    m = [list(row) + [b[i]] for i, row in enumerate(a)]
+    for col in range(n):
+        pivot = max(range(col, n), key=lambda r: abs(m[r][col]))
+        m[col], m[pivot] = m[pivot], m[col]
+        for r in range(n):
+            if r != col and m[r][col]:
+                f = m[r][col] / m[col][col]
+                for c in range(col, n + 1):
+                    m[r][c] -= f * m[col][c]
+    return [m[i][n] / m[i][i] for i in range(n)]
+
+def perspective_coeffs(dest, src):
+    """PERSPECTIVE transform data mapping each dest corner back to its src corner"""
+    rows, rhs = [], []
+    for (x, y), (u, v) in zip(dest, src):
+        rows.append([x, y, 1, 0, 0, 0, -u * x, -u * y])
+        rhs.append(u)
+        rows.append([0, 0, 0, x, y, 1, -v * x, -v * y])
+        rhs.append(v)
+    return solve_linear(rows, rhs)
+
+def make_proxy(img, max_pixels=PROXY_PIXELS):
+    """Box-reduce an image by the smallest integer factor that fits max_pixels"""
+    factor = math.ceil(math.sqrt(img.width * img.height / max_pixels))
+    return img.reduce(factor) if factor > 1 else img
+
+@lru_cache(maxsize=128)
+def flip_shadow_mask(width, height, bucket, leading):
+    """Gradient mask for the shadow along one edge of a flip frame.
+    
+    Cached per frame size and progress bucket, so drawing the shadow costs a
+    single paste per frame.
+    """
+    progress = bucket / SHADOW_BUCKETS
+    strength = 100 * ((1 - progress) if leading else progress)
+    strip = max(1, int(width * 0.2))
+    
+    row = bytes(int(strength * (1 - i / strip)) for i in range(strip))
+    if not leading:
+        row = row[::-1]
+    return Image.frombytes('L', (strip, 1), row).resize((strip, height), Image.Resampling.NEAREST)
+
+@lru_cache(maxsize=8)
+def page_curl_sprite(width, height):
+    """RGBA sprite of the bottom-right page curl and where to paste it"""
+    # Larger, more realistic curl
+    curl_width = int(width * 0.18)
+    curl_height = int(height * 0.30)
+    
+    # The highlight line is 4px wide, so leave a small margin
+    left = max(width - curl_width - 4, 0)
+    top = max(height - curl_height - 4, 0)
+    sprite = Image.new('RGBA', (width - left, height - top), (0, 0, 0, 0))
+    draw = ImageDraw.Draw(sprite)
+    
+    def local(points):
+        return [(x - left, y - top) for x, y in points]
+    
+    # Main curl shadow with gradient
+    shadow_polygon = [
+        (width - curl_width, height - curl_height),
+        (width, height - curl_height // 3),
+        (width, height),
+        (width - curl_width // 3, height)
+    ]
+    
+    # Enhanced shadow layers for depth
+    for i in range(40):
+        offset = i * 1.5
+        alpha = int(140 - (i * 3.5))
+        gray = 170 - (i * 4)
+        
+        offset_polygon = [
+            (shadow_polygon[0][0] + offset, shadow_polygon[0][1] + offset),
+            (shadow_polygon[1][0], shadow_polygon[1][1] + offset // 2),
+            shadow_polygon[2],
+            (shadow_polygon[3][0] + offset // 2, shadow_polygon[3][1])
+        ]
+        
+        draw.polygon(local(offset_polygon), fill=(gray, gray, gray, 255))
+    
+    # Curl fold with realistic lighting
+    curl_polygon = [
+        (width - curl_width, height - curl_height),
+        (width - 8, height - curl_height // 4),
+        (width - 3, height - 8),
+        (width - curl_width // 2, height - 3)
+    ]
+    
+    # Gradient on curl surface
+    for i in range(20):
+        gray = 230 - (i * 6)
+        offset_curl = [
+            (curl_polygon[0][0] + i, curl_polygon[0][1] + i),
+            (curl_polygon[1][0] - i//2, curl_polygon[1][1] + i//3),
+            (curl_polygon[2][0] - i//3, curl_polygon[2][1] - i//3),
+            (curl_polygon[3][0] + i//2, curl_polygon[3][1] - i//4)
+        ]
+        draw.polygon(local(offset_curl), fill=(gray, gray, min(gray + 15, 255), 255))
+    
+    # Bright highlight on curl edge
+    highlight_line = [
+        (width - curl_width, height - curl_height),
+        (width - curl_width // 2, height - 5)
+    ]
+    draw.line(local(highlight_line), fill=(250, 250, 250), width=4)
+    
+    # Curl edge definition
+    edge_line = [
+        (width - 10, height - curl_height // 4),
+        (width - 4, height - 10)
+    ]
+    draw.line(local(edge_line), fill=(180, 180, 185), width=3)
+    
+    # Add subtle inner shadow for depth
+    inner_shadow = [
+        (width - curl_width + 5, height - curl_height + 5),
+        (width - 15, height - curl_height // 3 + 5)
+    ]
+    draw.line(local(inner_shadow), fill=(140, 140, 140), width=2)
+    
+    return sprite, (left, top)
+
+class FlipEngine:
+    """Builds the frames of one page turn.
+    
+    Turning forward, the previously shown page lifts off the new one;
+    turning back (or with nothing shown yet), the new page comes down over
+    the old one. Frames are rendered at proxy resolution into a single
+    buffer that is overwritten on every call, and scaled up to the display
+    size by to_display().
+    """
+    
+    def __init__(self, page_img, previous_img=None, direction=1,
+                 max_proxy_pixels=PROXY_PIXELS, resample=Image.Resampling.BILINEAR,
+                 upscale=Image.Resampling.NEAREST):
+        self.display_size = page_img.size
+        self.resample = resample
+        self.upscale = upscale
+        
+        new_proxy = make_proxy(page_img, max_proxy_pixels)
+        self.size = new_proxy.size
+        old_proxy = None
+        if previous_img is not None:
+            old_proxy = make_proxy(previous_img, max_proxy_pixels)
+            if old_proxy.size != self.size:
+                old_proxy = old_proxy.resize(self.size, Image.Resampling.BILINEAR)
+        
+        self.lifting = direction >= 0 and old_proxy is not None
+        if self.lifting:
+            turning, self.below = old_proxy, new_proxy
+        else:
+            turning = new_proxy
+            self.below = old_proxy or Image.new('RGB', self.size, BACKGROUND)
+        
+        self.turning = turning.convert('RGBA')
+        self.frame = Image.new('RGB', self.size, BACKGROUND)
+        self.src_quad = [(0, 0), (self.size[0], 0), (self.size[0], self.size[1]), (0, self.size[1])]
+        
+        # Past this angle the sheet is edge-on to the camera
+        width = self.size[0]
+        self.max_angle = math.degrees(math.atan2(CAMERA_DISTANCE * width, width / 2))
+    
+    def page_quad(self, angle):
+        """Projected corners of the turning sheet at the given lift angle"""
+        width, height = self.size
+        theta = math.radians(angle)
+        distance = CAMERA_DISTANCE * width
+        
+        # The free edge rises toward the camera and grows with perspective
+        scale = distance / (distance - width * math.sin(theta))
+        edge_x = width / 2 + (width * math.cos(theta) - width / 2) * scale
+        half_height = height / 2 * scale
+        return [
+            (0, 0),
+            (edge_x, height / 2 - half_height),
+            (edge_x, height / 2 + half_height),
+            (0, height)
+        ]
+    
+    def angle_at(self, progress):
+        return (progress if self.lifting else 1 - progress) * self.max_angle
+    
+    def render_frame(self, progress):
+        """Render the frame for progress in [0, 1) into the shared buffer"""
+        self.frame.paste(self.below)
+        
+        quad = self.page_quad(self.angle_at(progress))
+        if quad[1][0] - quad[0][0] >= 1:
+            coeffs = perspective_coeffs(quad, self.src_quad)
+            warped = self.turning.transform(
+                self.size, Image.Transform.PERSPECTIVE, coeffs, self.resample, fillcolor=(0, 0, 0, 0))
+            self.frame.paste(warped, (0, 0), warped)
+        
+        return self.frame
+    
+    def to_display(self, frame):
+        if frame.size == self.display_size:
+            return frame
+        return frame.resize(self.display_size, self.upscale)
+
+class FrameScheduler:
+    """Runs a frame callback from Tk's after() against the wall clock.
+    
+    Progress comes from elapsed time rather than a frame counter, so when a
+    frame runs long the next one simply lands further along: late frames are
+    dropped instead of stretching the animation, and the event loop keeps
+    handling input between frames.
+    """
+    
+    def __init__(self, widget, duration, draw_frame, on_finish, interval=0.03):
+        self.widget = widget
+        self.duration = duration
+        self.draw_frame = draw_frame
+        self.on_finish = on_finish
+        self.interval = interval
+        self.job = None
+        self.started = None
+        self.frames_drawn = 0
+        self.dropped_frames = 0
+    
+    def start(self):
+        self.started = time.perf_counter()
+        self.tick()
+    
+    def tick(self):
+        self.job = None
+        frame_start = time.perf_counter()
+        progress = (frame_start - self.started) / self.duration
+        if progress >= 1:
+            self.finish()
+            return
+        
+        self.draw_frame(progress)
+        self.frames_drawn += 1
+        
+        spent = time.perf_counter() - frame_start
+        self.job = self.widget.after(max(1, int((self.interval - spent) * 1000)), self.tick)
+    
+    def finish(self, draw=True):
+        """End now; draw=False skips the final frame when another flip follows"""
+        if self.job is not None:
+            self.widget.after_cancel(self.job)
+            self.job = None
+        
+        expected = round(self.duration / self.interval)
+        self.dropped_frames = max(0, expected - self.frames_drawn) if draw else 0
+        self.on_finish(draw)
+
+class QualityGovernor:
+    """Picks the flip quality tier from how long frames actually take.
+    
+    After each flip the mean frame time is compared with the tier's frame
+    interval: a flip whose frames overran it steps down at once, while
+    stepping up needs a few flips in a row with plenty of headroom. Each
+    time a tier overruns, the streak needed before retrying it doubles, so
+    a tier that is just too slow is retried less and less often instead of
+    making every few flips janky. FLIPBOOK_FLIP_QUALITY=low/medium/high
+    pins a tier instead.
+    """
+    
+    UPGRADE_AFTER = 3  # consecutive fast flips before trying a better tier
+    MAX_UPGRADE_AFTER = 48  # cap on the backed-off streak for a tier that keeps overrunning
+    HEADROOM = 0.5  # a "fast" flip's frames took under this share of the interval
+    
+    def __init__(self, tier=None):
+        names = [t.name for t in QUALITY_TIERS]
+        pinned = tier or os.environ.get('FLIPBOOK_FLIP_QUALITY', 'auto')
+        self.adaptive = pinned not in names
+        self.index = names.index('medium' if self.adaptive else pinned)
+        self.frame_times = []
+        self.fast_flips = 0
+        self.upgrade_after = [self.UPGRADE_AFTER] * len(QUALITY_TIERS)  # streak needed to enter each tier
+    
+    @property
+    def tier(self):
+        return QUALITY_TIERS[self.index]
+    
+    def describe(self):
+        return f"{self.tier.name} ({'auto' if self.adaptive else 'fixed'})"
+    
+    def engine(self, page_img, previous_img, direction):
+        tier = self.tier
+        return FlipEngine(page_img, previous_img, direction, tier.proxy_pixels, tier.resample, tier.upscale)
+    
+    def record(self, frame_ms):
+        self.frame_times.append(frame_ms)
+    
+    def end_flip(self):
+        """Re-tier from the frames of the flip that just ended; returns the change"""
+        frame_times, self.frame_times = self.frame_times, []
+        if not self.adaptive or len(frame_times) < 2:
+            return 0
+        
+        # The first frame also pays for building the proxies
+        mean = sum(frame_times[1:]) / (len(frame_times) - 1)
+        budget = self.tier.interval * 1000
+        if mean > budget and self.index > 0:
+            self.upgrade_after[self.index] = min(self.upgrade_after[self.index] * 2, self.MAX_UPGRADE_AFTER)
+            self.index -= 1
+            self.fast_flips = 0
+            return -1
+        
+        self.fast_flips = self.fast_flips + 1 if mean < budget * self.HEADROOM else 0
+        if self.index < len(QUALITY_TIERS) - 1 and self.fast_flips >= self.upgrade_after[self.index + 1]:
+            self.index += 1
+            self.fast_flips = 0
+            return 1
+        return 0
+
+def apply_3d_perspective(engine, progress):
+    """Render one perspective frame of the page turn at proxy resolution"""
+    frame = engine.render_frame(progress)
+    
+    # Add shadow effect for depth; the buffer is repainted every frame anyway
+    return add_flip_shadow(frame, progress, progress * 180)
+
+def add_flip_shadow(img, progress, angle):
+    """Darken one edge of a flip frame in place for realism"""
+    # Left side shadow while the page leaves, right side as it arrives
+    leading = angle < 90
+    mask = flip_shadow_mask(img.width, img.height, int(progress * SHADOW_BUCKETS), leading)
+    x = 0 if leading else img.width - mask.width
+    img.paste((0, 0, 0), (x, 0, x + mask.width, img.height), mask)
+    
+    return img
+
+def add_page_curl_effect(img):
+    """Enhanced realistic page curl effect with gradient shadows"""
+    curl_img = img.copy()
+    
+    sprite, position = page_curl_sprite(img.width, img.height)
+    curl_img.paste(sprite, position, sprite)
+    
+    return curl_img
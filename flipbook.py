@@ -1,11 +1,663 @@
+import time
+STARTED = time.perf_counter()
+
 import tkinter as tk
-from tkinter import filedialog, messagebox, ttk
-from PIL import Image, ImageTk, ImageDraw
-import pygame
+from tkinter import filedialog, messagebox, simpledialog, ttk
+from PIL import Image, ImageTk
 import os
-import fitz
+import sys
 import subprocess
 import math
+import multiprocessing
+import argparse
+import shutil
+import threading
+from collections import OrderedDict
+from disk_cache import DiskCache
+from flip_engine import FrameScheduler, QualityGovernor, apply_3d_perspective, page_curl_sprite
+from page_bundle import BUNDLE_EXTENSION, PageBundle, is_bundle
+from perf_trace import configure_from_env, recorder
+from remote_pdf import RemoteDocument, is_url, url_name
+from render_cache import RenderCache, budget_from_env
+from search_index import INDEX_FILE, SearchIndex, normalize_words
+from render_pool import (
+    PagePrefetcher,
+    PageRenderService,
+    RenderPool,
+    SearchIndexer,
+    ThumbnailRenderEngine,
+    compose_spread,
+    display_lists,
+    fitted_scale,
+    fitted_size,
+    is_spread_key,
+    neighbour_pages,
+    page_cache_key,
+    render_fitted_page,
+    render_thumbnail,
+    render_tile,
+    render_tile_task,
+    spread_page_keys,
+    spread_pages,
+    thumbnail_cache_key,
+    view_key
+)
+
+FLIP_DURATION = 0.45  # seconds for one page turn
+MAX_ZOOM = 16.0
+ZOOM_SETTLE_MS = 250  # quiet time after the last zoom click before the sharp render
+RESIZE_SETTLE_MS = 150  # quiet time after the last resize event before re-fitting
+RESIZE_BUCKET = 32  # page area granularity in pixels, so small resizes reuse renders
+DOWNLOAD_POLL_MS = 250  # how often a PDF opened from a URL is checked for completion
+HASH_POLL_MS = 50  # how often a background hash of a newly seen PDF is checked for completion
+
+def resource_path(relative_path):
+    """Path of a bundled data file, from source or a PyInstaller build"""
+    base = getattr(sys, '_MEIPASS', os.path.dirname(os.path.abspath(__file__)))
+    return os.path.join(base, relative_path)
+
+def bucket_area(canvas_width, canvas_height):
+    """Area a fitted page may fill on a canvas, snapped down to RESIZE_BUCKET steps.
+    
+    View keys are built from this area, so resizing within a bucket keeps
+    hitting the same cached renders.
+    """
+    max_width = canvas_width - 40
+    max_height = canvas_height - 40
+    if max_width <= 1 or max_height <= 1:
+        # Not mapped yet; <Configure> re-fits once the real size is known
+        return 1000, 700
+    return (
+        max(max_width - max_width % RESIZE_BUCKET, RESIZE_BUCKET),
+        max(max_height - max_height % RESIZE_BUCKET, RESIZE_BUCKET)
+    )
+
+def embedded_bundle():
+    """Bundle shipped inside the exe by build_exe.py --bundle, if any"""
+    directory = resource_path('bundles')
+    if not os.path.isdir(directory):
+        return None
+    names = sorted(n for n in os.listdir(directory) if is_bundle(n))
+    return os.path.join(directory, names[0]) if names else None
+
+def warm_imports():
+    """Import PyMuPDF in the background so the first open does not pay for it"""
+    try:
+        import fitz  # noqa: F401
+    except ImportError as e:
+        print(f"PDF support unavailable: {e}")
+
+def parse_page_ranges(text, total_pages, current_pages):
+    """Turn "1-3, 7, current" into sorted 0-based page numbers; blank means all"""
+    text = text.strip().lower()
+    if not text or text == 'all':
+        return list(range(total_pages))
+    
+    pages = set()
+    for part in text.replace(';', ',').split(','):
+        part = part.strip()
+        if not part:
+            continue
+        if part == 'current':
+            pages.update(current_pages)
+            continue
+        
+        first, _, last = part.partition('-')
+        first = int(first) if first.strip() else 1
+        last = int(last) if last.strip() else (total_pages if _ else first)
+        if first > last:
+            first, last = last, first
+        pages.update(range(max(first, 1) - 1, min(last, total_pages)))
+    
+    if not pages:
+        raise ValueError("no pages in range")
+    return sorted(pages)
+
+def page_runs(pages):
+    """Group sorted page numbers into (first, last) runs of consecutive pages"""
+    runs = []
+    for page_num in pages:
+        if runs and page_num == runs[-1][1] + 1:
+            runs[-1][1] = page_num
+        else:
+            runs.append([page_num, page_num])
+    return runs
+
+def ppm_photo(width, height, samples):
+    """Tk bitmap straight from raw RGB samples, without a PIL image in between"""
+    header = f"P6 {width} {height} 255\n".encode('ascii')
+    return tk.PhotoImage(data=header + samples, format='PPM')
+
+class VirtualThumbnailList:
+    """Virtualized thumbnail sidebar drawn straight onto a canvas.
+    
+    Only the rows inside the scroll viewport get canvas items, taken from a
+    small pool of recycled slots. Rendered bitmaps are kept in a fixed-size
+    LRU, so memory use does not grow with the page count. When a render
+    engine is attached, thumbnails are produced in the background in
+    viewport-first order and streamed in as they finish.
+    """
+    
+    THUMB_WIDTH = 110
+    LABEL_HEIGHT = 18
+    ROW_PADDING = 10
+    MAX_BITMAPS = 40
+    
+    def __init__(self, canvas, scrollbar, on_select, render_thumbnail, cached_thumbnail=None):
+        self.canvas = canvas
+        self.scrollbar = scrollbar
+        self.on_select = on_select
+        self.render_thumbnail = render_thumbnail
+        self.cached_thumbnail = cached_thumbnail
+        
+        self.page_count = 0
+        self.thumb_height = int(self.THUMB_WIDTH * 1.4)
+        self.row_height = self.thumb_height + self.LABEL_HEIGHT + self.ROW_PADDING
+        self.current_page = None
+        
+        self.visible_slots = {}  # page_num -> slot
+        self.free_slots = []
+        self.bitmaps = OrderedDict()  # page_num -> PhotoImage, oldest first
+        self.engine = None
+        self.render_job = None
+        self.load_started = None  # perf_counter when the list was reset, until the first screenful is drawn
+        
+        self.canvas.configure(yscrollcommand=self.on_scroll)
+        self.canvas.bind('<Configure>', lambda e: self.refresh())
+        self.canvas.bind('<Button-1>', self.on_click)
+        self.canvas.bind('<MouseWheel>', self.on_mousewheel)
+        self.canvas.bind('<Button-4>', lambda e: self.canvas.yview_scroll(-1, 'units'))
+        self.canvas.bind('<Button-5>', lambda e: self.canvas.yview_scroll(1, 'units'))
+    
+    def set_page_count(self, page_count, aspect, engine=None):
+        """Reset the list for a newly loaded document"""
+        self.page_count = page_count
+        self.engine = engine
+        self.thumb_height = max(40, min(int(self.THUMB_WIDTH * aspect), 3 * self.THUMB_WIDTH))
+        self.row_height = self.thumb_height + self.LABEL_HEIGHT + self.ROW_PADDING
+        self.current_page = None
+        self.load_started = time.perf_counter() if page_count else None
+        
+        for page_num in list(self.visible_slots):
+            self.release_slot(page_num)
+        self.bitmaps.clear()
+        if self.render_job is not None:
+            self.canvas.after_cancel(self.render_job)
+            self.render_job = None
+        
+        self.canvas.configure(
+            scrollregion=(0, 0, self.THUMB_WIDTH + 2 * self.ROW_PADDING, page_count * self.row_height),
+            yscrollincrement=self.row_height // 4
+        )
+        self.canvas.yview_moveto(0)
+        self.refresh()
+    
+    def on_scroll(self, first, last):
+        self.scrollbar.set(first, last)
+        self.refresh()
+    
+    def on_mousewheel(self, event):
+        self.canvas.yview_scroll(-1 if event.delta > 0 else 1, 'units')
+    
+    def on_click(self, event):
+        page_num = int(self.canvas.canvasy(event.y) // self.row_height)
+        if 0 <= page_num < self.page_count:
+            self.on_select(page_num)
+    
+    def visible_range(self):
+        top = self.canvas.canvasy(0)
+        bottom = top + max(self.canvas.winfo_height(), self.row_height)
+        first = max(int(top // self.row_height), 0)
+        last = min(int(bottom // self.row_height), self.page_count - 1)
+        return range(first, last + 1)
+    
+    def wanted_pages(self):
+        """Visible rows first, then a band growing outward from the viewport"""
+        visible = self.visible_range()
+        pages = list(visible)
+        below, above = visible.stop, visible.start - 1
+        while len(pages) < self.MAX_BITMAPS and (below < self.page_count or above >= 0):
+            if below < self.page_count:
+                pages.append(below)
+                below += 1
+            if above >= 0:
+                pages.append(above)
+                above -= 1
+        return pages[:self.MAX_BITMAPS]
+    
+    def refresh(self):
+        """Bind slots to the rows currently inside the viewport"""
+        wanted = self.visible_range() if self.page_count else range(0)
+        
+        for page_num in list(self.visible_slots):
+            if page_num not in wanted:
+                self.release_slot(page_num)
+        
+        for page_num in wanted:
+            if page_num not in self.visible_slots:
+                slot = self.free_slots.pop() if self.free_slots else self.create_slot()
+                self.visible_slots[page_num] = slot
+                self.bind_slot(slot, page_num)
+                
+                # Thumbnails cached on disk show up without waiting for a render
+                if page_num not in self.bitmaps and self.cached_thumbnail:
+                    img = self.cached_thumbnail(page_num, self.THUMB_WIDTH, self.thumb_height)
+                    if img is not None:
+                        self.set_bitmap(page_num, img)
+        
+        if self.engine or any(p not in self.bitmaps for p in self.visible_slots):
+            self.schedule_render()
+    
+    def create_slot(self):
+        return {
+            'box': self.canvas.create_rectangle(0, 0, 0, 0, fill='#34495E', outline='#34495E', width=2),
+            'image': self.canvas.create_image(0, 0, anchor='center'),
+            'label': self.canvas.create_text(0, 0, font=('Arial', 8), fill='white'),
+        }
+    
+    def bind_slot(self, slot, page_num):
+        x0 = self.ROW_PADDING
+        y0 = page_num * self.row_height + self.ROW_PADDING // 2
+        x1 = x0 + self.THUMB_WIDTH
+        y1 = y0 + self.thumb_height + self.LABEL_HEIGHT
+        
+        outline = '#3498DB' if page_num == self.current_page else '#34495E'
+        self.canvas.coords(slot['box'], x0, y0, x1, y1)
+        self.canvas.itemconfigure(slot['box'], outline=outline, state='normal')
+        self.canvas.coords(slot['image'], (x0 + x1) // 2, y0 + self.thumb_height // 2)
+        self.canvas.coords(slot['label'], (x0 + x1) // 2, y1 - self.LABEL_HEIGHT // 2)
+        self.canvas.itemconfigure(slot['label'], text=f"{page_num + 1:02d}", state='normal')
+        
+        # Rows without a bitmap yet just show the empty box as a placeholder
+        bitmap = self.bitmaps.get(page_num)
+        if bitmap:
+            self.bitmaps.move_to_end(page_num)
+        self.canvas.itemconfigure(slot['image'], image=bitmap or '', state='normal')
+    
+    def release_slot(self, page_num):
+        slot = self.visible_slots.pop(page_num)
+        for item in slot.values():
+            self.canvas.itemconfigure(item, state='hidden')
+        self.canvas.itemconfigure(slot['image'], image='')
+        self.free_slots.append(slot)
+    
+    def set_current(self, page_num):
+        """Highlight the page being shown and scroll it into view"""
+        previous = self.current_page
+        self.current_page = page_num
+        for p in (previous, page_num):
+            if p in self.visible_slots:
+                self.bind_slot(self.visible_slots[p], p)
+        
+        if page_num not in self.visible_range() and self.page_count:
+            self.canvas.yview_moveto(page_num / self.page_count)
+    
+    def set_bitmap(self, page_num, img):
+        with recorder.stage('thumb_photoimage'):
+            photo = ImageTk.PhotoImage(img)
+        self.store_bitmap(page_num, photo)
+    
+    def store_bitmap(self, page_num, photo):
+        """Store a thumbnail bitmap, evicting the least recently used ones"""
+        self.bitmaps[page_num] = photo
+        self.bitmaps.move_to_end(page_num)
+        
+        while len(self.bitmaps) > max(self.MAX_BITMAPS, len(self.visible_slots)):
+            oldest = next(p for p in self.bitmaps if p not in self.visible_slots)
+            del self.bitmaps[oldest]
+        
+        if page_num in self.visible_slots:
+            self.bind_slot(self.visible_slots[page_num], page_num)
+        
+        if self.load_started is not None and self.visible_slots and all(p in self.bitmaps for p in self.visible_slots):
+            # Time from opening until every visible row has its thumbnail
+            recorder.record('load_thumbnails', (time.perf_counter() - self.load_started) * 1000)
+            self.load_started = None
+    
+    def schedule_render(self):
+        if self.render_job is None:
+            if self.engine:
+                self.render_job = self.canvas.after(0, self.pump_engine)
+            else:
+                self.render_job = self.canvas.after_idle(self.render_next)
+    
+    def pump_engine(self):
+        """Collect finished background renders and re-prioritize the rest"""
+        self.render_job = None
+        if not self.engine or not self.page_count:
+            return
+        
+        for page_num, pixels in self.engine.poll():
+            if pixels is None:
+                self.bitmaps[page_num] = None
+            else:
+                with recorder.stage('thumb_photoimage'):
+                    photo = ppm_photo(*pixels)
+                self.store_bitmap(page_num, photo)
+        
+        wanted = self.wanted_pages()
+        for page_num in wanted:
+            # Keep wanted bitmaps fresh so eviction hits stale rows first
+            if page_num in self.bitmaps:
+                self.bitmaps.move_to_end(page_num)
+        self.engine.prioritize(
+            [p for p in wanted if p not in self.bitmaps],
+            self.THUMB_WIDTH,
+            self.thumb_height
+        )
+        
+        if self.engine.busy():
+            self.render_job = self.canvas.after(30, self.pump_engine)
+    
+    def render_next(self):
+        """Render one missing visible thumbnail, then yield back to the event loop"""
+        self.render_job = None
+        missing = [p for p in sorted(self.visible_slots) if p not in self.bitmaps]
+        if not missing:
+            return
+        
+        try:
+            img = self.render_thumbnail(missing[0], self.THUMB_WIDTH, self.thumb_height)
+            self.set_bitmap(missing[0], img)
+        except Exception as e:
+            print(f"Thumbnail error on page {missing[0] + 1}: {e}")
+            self.bitmaps[missing[0]] = None
+        
+        if len(missing) > 1:
+            self.render_job = self.canvas.after(1, self.render_next)
+
+class TiledPageView:
+    """Deep-zoom view of one page that only renders tiles inside the viewport.
+    
+    The canvas scroll region spans the whole page at the current scale, so
+    panning is plain canvas scrolling. Tiles come from a byte-bounded cache
+    keyed by (page, scale, tile x, tile y) and are rendered from a clip of
+    the page's display list on the render pool, or one per idle callback
+    when no pool is available.
+    """
+    
+    TILE_SIZE = 256
+    
+    def __init__(self, canvas, render_tile):
+        self.canvas = canvas
+        self.render_tile = render_tile
+        self.pool = None
+        self.cache = RenderCache(budget_from_env('FLIPBOOK_TILE_CACHE_MB', 128))
+        
+        self.active = False
+        self.page_num = None
+        self.scale = 1.0
+        self.page_size = (0, 0)
+        self.origin = (0, 0)
+        
+        self.items = {}  # (tile_x, tile_y) -> (canvas item, PhotoImage)
+        self.in_flight = {}  # cache key -> Future
+        self.missing = []
+        self.render_job = None
+        
+        self.canvas.configure(xscrollincrement=64, yscrollincrement=64)
+        self.canvas.bind('<ButtonPress-1>', self.on_press)
+        self.canvas.bind('<B1-Motion>', self.on_drag)
+        self.canvas.bind('<MouseWheel>', lambda e: self.scroll('y', -1 if e.delta > 0 else 1))
+        self.canvas.bind('<Shift-MouseWheel>', lambda e: self.scroll('x', -1 if e.delta > 0 else 1))
+        self.canvas.bind('<Button-4>', lambda e: self.scroll('y', -1))
+        self.canvas.bind('<Button-5>', lambda e: self.scroll('y', 1))
+    
+    def set_pool(self, pool):
+        self.cancel_renders()
+        self.pool = pool
+    
+    def show(self, page_num, page_rect, scale):
+        """Display page_num at scale, keeping the view centre when re-zooming"""
+        if self.active and page_num == self.page_num:
+            center = self.view_center()
+        else:
+            center = (0.5, 0.5)
+        
+        self.cancel_renders()
+        self.clear_tiles()
+        self.canvas.delete('all')
+        self.active = True
+        self.page_num = page_num
+        self.scale = scale
+        
+        width = math.ceil(page_rect.width * scale)
+        height = math.ceil(page_rect.height * scale)
+        view_width = max(self.canvas.winfo_width(), 1)
+        view_height = max(self.canvas.winfo_height(), 1)
+        
+        # Centre pages that are smaller than the viewport
+        self.page_size = (width, height)
+        self.origin = (max(0, (view_width - width) // 2), max(0, (view_height - height) // 2))
+        region_width, region_height = max(width, view_width), max(height, view_height)
+        self.canvas.configure(scrollregion=(0, 0, region_width, region_height))
+        
+        self.canvas.xview_moveto(max(0, center[0] * width + self.origin[0] - view_width / 2) / region_width)
+        self.canvas.yview_moveto(max(0, center[1] * height + self.origin[1] - view_height / 2) / region_height)
+        self.refresh()
+    
+    def hide(self):
+        if not self.active:
+            return
+        
+        self.active = False
+        self.cancel_renders()
+        self.clear_tiles()
+        self.canvas.configure(scrollregion=(0, 0, 0, 0))
+        self.canvas.xview_moveto(0)
+        self.canvas.yview_moveto(0)
+    
+    def view_center(self):
+        """Centre of the viewport as a fraction of the page"""
+        x = self.canvas.canvasx(self.canvas.winfo_width() / 2) - self.origin[0]
+        y = self.canvas.canvasy(self.canvas.winfo_height() / 2) - self.origin[1]
+        return (
+            min(max(x / max(self.page_size[0], 1), 0), 1),
+            min(max(y / max(self.page_size[1], 1), 0), 1)
+        )
+    
+    def on_press(self, event):
+        if self.active:
+            self.canvas.scan_mark(event.x, event.y)
+    
+    def on_drag(self, event):
+        if self.active:
+            self.canvas.scan_dragto(event.x, event.y, gain=1)
+            self.refresh()
+    
+    def scroll(self, axis, units):
+        if not self.active:
+            return
+        if axis == 'x':
+            self.canvas.xview_scroll(units, 'units')
+        else:
+            self.canvas.yview_scroll(units, 'units')
+        self.refresh()
+    
+    def tile_key(self, tile):
+        return (self.page_num, round(self.scale, 4), tile[0], tile[1])
+    
+    def visible_tiles(self):
+        size = self.TILE_SIZE
+        left = self.canvas.canvasx(0) - self.origin[0]
+        top = self.canvas.canvasy(0) - self.origin[1]
+        right = left + self.canvas.winfo_width()
+        bottom = top + self.canvas.winfo_height()
+        
+        columns = math.ceil(self.page_size[0] / size)
+        rows = math.ceil(self.page_size[1] / size)
+        xs = range(max(0, int(left // size)), min(columns, int(right // size) + 1))
+        ys = range(max(0, int(top // size)), min(rows, int(bottom // size) + 1))
+        
+        # Centre tiles first so the middle of the screen sharpens first
+        mid_x, mid_y = (xs.start + xs.stop) / 2, (ys.start + ys.stop) / 2
+        return sorted(((x, y) for x in xs for y in ys),
+                      key=lambda t: abs(t[0] + 0.5 - mid_x) + abs(t[1] + 0.5 - mid_y))
+    
+    def refresh(self):
+        """Place cached tiles in view, drop tiles out of view, request the rest"""
+        if not self.active:
+            return
+        
+        wanted = self.visible_tiles()
+        wanted_set = set(wanted)
+        for tile in list(self.items):
+            if tile not in wanted_set:
+                self.canvas.delete(self.items.pop(tile)[0])
+        
+        self.missing = []
+        for tile in wanted:
+            if tile in self.items:
+                continue
+            img = self.cache.get(self.tile_key(tile))
+            if img is not None:
+                self.place_tile(tile, img)
+            else:
+                self.missing.append(self.tile_key(tile))
+        
+        if self.pool:
+            # Tiles panned out of view before they started are not worth rendering
+            for key in list(self.in_flight):
+                if key not in self.missing:
+                    self.in_flight.pop(key).cancel()
+            for key in self.missing:
+                if key not in self.in_flight:
+                    self.in_flight[key] = self.pool.submit(
+                        render_tile_task, key[0], self.scale, key[2], key[3], self.TILE_SIZE)
+        
+        if self.missing and self.render_job is None:
+            if self.pool:
+                self.render_job = self.canvas.after(30, self.poll_tiles)
+            else:
+                self.render_job = self.canvas.after_idle(self.render_next)
+    
+    def place_tile(self, tile, img):
+        photo = ImageTk.PhotoImage(img)
+        item = self.canvas.create_image(
+            self.origin[0] + tile[0] * self.TILE_SIZE,
+            self.origin[1] + tile[1] * self.TILE_SIZE,
+            image=photo,
+            anchor='nw'
+        )
+        self.items[tile] = (item, photo)
+    
+    def store_tile(self, key, img):
+        self.cache.put(key, img)
+        tile = key[2:]
+        if self.active and key == self.tile_key(tile) and tile not in self.items:
+            if tile in self.visible_tiles():
+                self.place_tile(tile, img)
+    
+    def poll_tiles(self):
+        self.render_job = None
+        for key, future in list(self.in_flight.items()):
+            if not future.done():
+                continue
+            del self.in_flight[key]
+            try:
+                self.store_tile(key, future.result())
+            except Exception as e:
+                print(f"Tile error on page {key[0] + 1}: {e}")
+        
+        if self.in_flight:
+            self.render_job = self.canvas.after(30, self.poll_tiles)
+    
+    def render_next(self):
+        """Main-thread fallback: render one tile, then yield to the event loop"""
+        self.render_job = None
+        if not self.active or not self.missing:
+            return
+        
+        key = self.missing.pop(0)
+        try:
+            self.store_tile(key, self.render_tile(key[0], self.scale, key[2], key[3], self.TILE_SIZE))
+        except Exception as e:
+            print(f"Tile error on page {key[0] + 1}: {e}")
+        
+        if self.missing:
+            self.render_job = self.canvas.after(1, self.render_next)
+    
+    def cancel_renders(self):
+        for future in self.in_flight.values():
+            future.cancel()
+        self.in_flight = {}
+        self.missing = []
+        if self.render_job is not None:
+            self.canvas.after_cancel(self.render_job)
+            self.render_job = None
+    
+    def clear_tiles(self):
+        for item, _ in self.items.values():
+            self.canvas.delete(item)
+        self.items = {}
+
+class PerfHud:
+    """Toggleable overlay with frame rate, dropped frames and stage timings.
+    
+    The text is rebuilt a few times a second from the shared recorder and
+    drawn in the top-left corner of the viewport, above whatever the page
+    view has put on the canvas.
+    """
+    
+    INTERVAL_MS = 250
+    
+    def __init__(self, canvas, page_cache, flip_quality):
+        self.canvas = canvas
+        self.page_cache = page_cache
+        self.flip_quality = flip_quality
+        self.visible = False
+        self.job = None
+    
+    def toggle(self):
+        self.set_visible(not self.visible)
+    
+    def set_visible(self, visible):
+        self.visible = visible
+        # Timing costs nothing while neither the HUD nor a trace wants it
+        recorder.enabled = visible or recorder.trace is not None
+        if visible:
+            self.update()
+        else:
+            if self.job is not None:
+                self.canvas.after_cancel(self.job)
+                self.job = None
+            self.canvas.delete('hud')
+    
+    def text(self):
+        lines = [
+            f"FPS {recorder.fps():.0f}   dropped {recorder.counters['dropped_frames']}",
+            f"flip quality {self.flip_quality.describe()}",
+        ]
+        for name, (mean, worst) in sorted(recorder.summary().items()):
+            lines.append(f"{name:<16} {mean:6.1f} ms  max {worst:6.1f}")
+        
+        stats = self.page_cache.stats()
+        lines.append(f"page cache {stats['hit_rate']:.0%} hits, {stats['bytes'] / (1024 * 1024):.0f} MB")
+        return '\n'.join(lines)
+    
+    def draw(self):
+        if not self.visible:
+            return
+        
+        x = self.canvas.canvasx(8)
+        y = self.canvas.canvasy(8)
+        text = self.canvas.find_withtag('hud_text')
+        if not text:
+            self.canvas.create_rectangle(0, 0, 0, 0, fill='black', stipple='gray50', outline='', tags=('hud', 'hud_box'))
+            self.canvas.create_text(0, 0, anchor='nw', font=('Courier', 9), fill='#00FF66', tags=('hud', 'hud_text'))
+        
+        self.canvas.itemconfigure('hud_text', text=self.text())
+        self.canvas.coords('hud_text', x + 6, y + 4)
+        left, top, right, bottom = self.canvas.bbox('hud_text')
+        self.canvas.coords('hud_box', left - 6, top - 4, right + 6, bottom + 4)
+        self.canvas.tag_raise('hud')
+    
+    def update(self):
+        self.job = None
+        if not self.visible:
+            return
+        self.draw()
+        self.job = self.canvas.after(self.INTERVAL_MS, self.update)
 
 class FlipbookPDFViewer:
     def __init__(self, root):
@@ -14,27 +666,62 @@ class FlipbookPDFViewer:
         self.root.geometry("1400x800")
         self.root.configure(bg='#8B9DA8')
         
-        try:
-            pygame.mixer.init()
-            self.audio_available = True
-        except:
-            self.audio_available = False
+        # Set by the audio thread once the mixer is up
+        self.audio_available = False
         
         self.pdf_document = None
+        self.bundle = None  # set instead of a PDF when a pre-rendered bundle is open
+        self.remote = None  # RemoteDocument of a PDF opened from a URL; owns the downloaded copy
+        self.download_job = None
         self.current_page = 0
         self.total_pages = 0
         self.zoom_level = 1.0
         self.is_fullscreen = False
         self.page_images = []
-        self.thumbnail_images = []
-        self.flip_animation_running = False
+        self.flip_animation = None
+        self.flip_job = None
+        self.refit_job = None
+        self.resize_preview_job = None
+        self.canvas_size = None
+        self.displayed_image = None
+        self.flip_direction = 1
+        self.file_path = None
+        self.render_pool = None
+        self.thumbnail_engine = None
+        self.prefetcher = None
+        self.prefetch_job = None
+        self.page_service = None
+        self.page_job = None
+        self.flip_target = None
+        self.wanted_key = None
+        self.spread_mode = False
+        self.image_origin = (0, 0)
+        self.page_photo = None  # reused while the page size stays the same
+        self.curl_photo = None  # (page size, sprite bitmap, sprite position)
+        self.search_index = None
+        self.indexer = None
+        self.index_job = None
+        self.search_job = None
+        self.search_query = ''
+        self.search_hits = []
+        self.page_cache = RenderCache()
+        self.flip_quality = QualityGovernor()
+        self.disk_cache = DiskCache()
+        self.document_cache = None
+        self.hash_future = None
+        self.hash_job = None
+        self.time_to_first_page = None
         
         self.page_turn_sound = None
         self.sound_enabled = True
         
+        self.startup_time = None
+        
         self.setup_ui()
-        if self.audio_available:
-            self.load_sounds()
+        
+        # Neither the audio nor the PDF stack is needed to show the window
+        threading.Thread(target=self.load_sounds, daemon=True).start()
+        threading.Thread(target=warm_imports, daemon=True).start()
     
     def setup_ui(self):
         main_container = tk.Frame(self.root, bg='#8B9DA8')
@@ -56,15 +743,18 @@ class FlipbookPDFViewer:
         
         self.thumbnail_canvas = tk.Canvas(self.sidebar, bg='#2C3E50', highlightthickness=0)
         scrollbar = tk.Scrollbar(self.sidebar, orient="vertical", command=self.thumbnail_canvas.yview)
-        self.thumbnail_frame = tk.Frame(self.thumbnail_canvas, bg='#2C3E50')
         
-        self.thumbnail_canvas.configure(yscrollcommand=scrollbar.set)
         scrollbar.pack(side=tk.RIGHT, fill=tk.Y)
         self.thumbnail_canvas.pack(side=tk.LEFT, fill=tk.BOTH, expand=True)
-        self.thumbnail_canvas.create_window((0, 0), window=self.thumbnail_frame, anchor='nw')
         
-        self.thumbnail_frame.bind('<Configure>', lambda e: self.thumbnail_canvas.configure(
-            scrollregion=self.thumbnail_canvas.bbox('all')))
+        # Only the rows inside the viewport are ever drawn
+        self.thumbnail_list = VirtualThumbnailList(
+            self.thumbnail_canvas,
+            scrollbar,
+            on_select=self.goto_page,
+            render_thumbnail=self.render_thumbnail,
+            cached_thumbnail=self.cached_thumbnail
+        )
         
         content_area = tk.Frame(main_container, bg='#8B9DA8')
         content_area.pack(side=tk.LEFT, fill=tk.BOTH, expand=True)
@@ -91,11 +781,43 @@ class FlipbookPDFViewer:
         )
         self.page_label.pack(side=tk.RIGHT, padx=20, pady=10)
         
+        # Ctrl+F to search; Enter / Shift+Enter step through matching pages
+        self.search_var = tk.StringVar()
+        search_entry = tk.Entry(
+            top_bar,
+            textvariable=self.search_var,
+            font=('Arial', 11),
+            width=24,
+            relief=tk.FLAT
+        )
+        search_entry.pack(side=tk.RIGHT, pady=12)
+        search_entry.bind('<KeyRelease>', lambda e: self.schedule_search())
+        search_entry.bind('<Return>', lambda e: self.next_search_hit(1))
+        search_entry.bind('<Shift-Return>', lambda e: self.next_search_hit(-1))
+        self.root.bind('<Control-f>', lambda e: search_entry.focus_set())
+        
+        self.search_label = tk.Label(
+            top_bar,
+            text="🔍",
+            font=('Arial', 10),
+            bg='#6C7A89',
+            fg='white'
+        )
+        self.search_label.pack(side=tk.RIGHT, padx=(0, 6), pady=10)
+        
         self.canvas_container = tk.Frame(content_area, bg='#8B9DA8')
         self.canvas_container.pack(expand=True, fill=tk.BOTH, padx=20, pady=20)
         
         self.canvas = tk.Canvas(self.canvas_container, bg='#8B9DA8', highlightthickness=0)
         self.canvas.pack(expand=True, fill=tk.BOTH)
+        self.canvas.bind('<Configure>', self.on_canvas_configure)
+        
+        # Zooming past 1.0 switches the canvas to tiled deep-zoom mode
+        self.tiled_view = TiledPageView(self.canvas, self.render_tile)
+        
+        # F3 shows frame timings; FLIPBOOK_HUD=1 or --hud shows them at startup
+        self.perf_hud = PerfHud(self.canvas, self.page_cache, self.flip_quality)
+        self.root.bind('<F3>', lambda e: self.perf_hud.toggle())
         
         control_panel = tk.Frame(content_area, bg='#34495E', height=80)
         control_panel.pack(fill=tk.X)
@@ -134,6 +856,7 @@ class FlipbookPDFViewer:
             **{k:v for k,v in btn_style.items() if k not in ['bg', 'activebackground']}
         )
         load_btn.grid(row=0, column=1, padx=5)
+        self.root.bind('<Control-l>', lambda e: self.open_url())
         
         zoom_out_btn = tk.Button(
             btn_container,
@@ -159,6 +882,14 @@ class FlipbookPDFViewer:
         )
         fullscreen_btn.grid(row=0, column=4, padx=5)
         
+        self.spread_btn = tk.Button(
+            btn_container,
+            text="📖 Spread",
+            command=self.toggle_spread,
+            **btn_style
+        )
+        self.spread_btn.grid(row=0, column=5, padx=5)
+        
         self.next_btn = tk.Button(
             btn_container,
             text="Next ▶",
@@ -166,7 +897,7 @@ class FlipbookPDFViewer:
             state=tk.DISABLED,
             **btn_style
         )
-        self.next_btn.grid(row=0, column=5, padx=5)
+        self.next_btn.grid(row=0, column=6, padx=5)
         
         print_btn = tk.Button(
             btn_container,
@@ -176,7 +907,7 @@ class FlipbookPDFViewer:
             activebackground='#D35400',
             **{k:v for k,v in btn_style.items() if k not in ['bg', 'activebackground']}
         )
-        print_btn.grid(row=0, column=6, padx=5)
+        print_btn.grid(row=0, column=7, padx=5)
         
         download_btn = tk.Button(
             btn_container,
@@ -186,7 +917,7 @@ class FlipbookPDFViewer:
             activebackground='#7D3C98',
             **{k:v for k,v in btn_style.items() if k not in ['bg', 'activebackground']}
         )
-        download_btn.grid(row=0, column=7, padx=5)
+        download_btn.grid(row=0, column=8, padx=5)
         
         export_btn = tk.Button(
             btn_container,
@@ -196,14 +927,23 @@ class FlipbookPDFViewer:
             activebackground='#138D75',
             **{k:v for k,v in btn_style.items() if k not in ['bg', 'activebackground']}
         )
-        export_btn.grid(row=0, column=8, padx=5)
+        export_btn.grid(row=0, column=9, padx=5)
     
     def load_sounds(self):
+        """Start the mixer and preload the page-turn sound; runs on a worker thread"""
         try:
-            if os.path.exists('sounds/page_turn.wav'):
-                self.page_turn_sound = pygame.mixer.Sound('sounds/page_turn.wav')
+            import pygame
+            pygame.mixer.init()
+        except Exception:
+            return
+        
+        try:
+            sound_path = resource_path(os.path.join('sounds', 'page_turn.wav'))
+            if os.path.exists(sound_path):
+                self.page_turn_sound = pygame.mixer.Sound(sound_path)
         except Exception as e:
             print(f"Sound loading error: {e}")
+        self.audio_available = True
     
     def play_page_sound(self):
         if self.audio_available and self.sound_enabled and self.page_turn_sound:
@@ -215,311 +955,920 @@ class FlipbookPDFViewer:
     def load_pdf(self):
         file_path = filedialog.askopenfilename(
             title="Select PDF File",
-            filetypes=[("PDF files", "*.pdf"), ("All files", "*.*")]
+            filetypes=[
+                ("PDF files and bundles", f"*.pdf *{BUNDLE_EXTENSION}"),
+                ("PDF files", "*.pdf"),
+                ("Flipbook bundles", f"*{BUNDLE_EXTENSION}"),
+                ("All files", "*.*")
+            ]
         )
         
         if not file_path:
             return
         
+        self.open_document(file_path)
+    
+    def open_url(self):
+        url = simpledialog.askstring("Open URL", "Address of a PDF (http:// or https://)", parent=self.root)
+        if url and url.strip():
+            self.open_document(url.strip())
+    
+    def open_document(self, file_path):
+        """Show page 1 as soon as possible and set up everything else afterwards"""
+        start = time.perf_counter()
         try:
-            if self.pdf_document:
+            if self.flip_animation:
+                self.flip_animation.finish(draw=False)
+            self.cancel_refit()
+            # Results from the old document's workers must not land on this one
+            self.shutdown_workers()
+            self.thumbnail_list.set_page_count(0, 1.4)
+            self.search_index = None
+            self.search_hits = []
+            if self.pdf_document is not None:
                 self.pdf_document.close()
+                # Nothing may touch the closed document if the new one fails to open
+                self.pdf_document = None
+            self.discard_remote()
             
-            self.pdf_document = fitz.open(file_path)
+            self.bundle = None
+            if is_bundle(file_path):
+                # Pre-rendered pages stand in for the PDF; PyMuPDF is never used
+                self.bundle = PageBundle(file_path)
+                self.pdf_document = self.bundle
+            elif is_url(file_path):
+                # Only what page 1 needs is fetched before it is shown
+                self.remote = RemoteDocument(file_path)
+                self.pdf_document = self.remote
+            else:
+                import fitz
+                self.pdf_document = fitz.open(file_path)
+            self.file_path = file_path
+            self.page_cache.clear()
+            display_lists.clear()
+            self.tiled_view.hide()
+            self.tiled_view.cache.clear()
+            self.displayed_image = None
             self.total_pages = len(self.pdf_document)
             self.current_page = 0
             self.zoom_level = 1.0  # Reset zoom level
             
-            filename = os.path.basename(file_path)
-            self.title_label.config(text=filename)
-            
-            # Update canvas before loading
-            self.canvas.update_idletasks()
-            
-            self.load_thumbnails()
+            # Only reuse the disk cache now if the hash is already known
+            self.open_document_cache()
             
+            filename = url_name(file_path) if self.remote is not None else os.path.basename(file_path)
+            self.title_label.config(text=f"{filename}  ({self.total_pages} pages)")
             self.prev_btn.config(state=tk.NORMAL)
             self.next_btn.config(state=tk.NORMAL)
             
-            # Give a moment for UI to update before rendering
-            self.root.after(100, self.show_page_with_flip)
-            
-            messagebox.showinfo("Success", f"Loaded PDF with {self.total_pages} pages!")
+            self.show_first_page()
+            self.root.update_idletasks()
         
         except Exception as e:
+            self.clear_document()
             messagebox.showerror("Error", f"Failed to load PDF: {e}\n\nPlease make sure the PDF file is valid and not corrupted.")
-    
-    def load_thumbnails(self):
-        for widget in self.thumbnail_frame.winfo_children():
-            widget.destroy()
+            return
         
-        self.thumbnail_images = []
+        self.time_to_first_page = (time.perf_counter() - start) * 1000
+        recorder.record('first_page', self.time_to_first_page, kind='open')
         
-        for page_num in range(self.total_pages):
-            page = self.pdf_document[page_num]
-            pix = page.get_pixmap(matrix=fitz.Matrix(0.2, 0.2))
-            img = Image.frombytes("RGB", [pix.width, pix.height], pix.samples)
-            
-            thumb_photo = ImageTk.PhotoImage(img)
-            self.thumbnail_images.append(thumb_photo)
-            
-            thumb_frame = tk.Frame(self.thumbnail_frame, bg='#34495E', bd=1, relief=tk.RAISED)
-            thumb_frame.pack(pady=5, padx=5)
-            
-            thumb_btn = tk.Button(
-                thumb_frame,
-                image=thumb_photo,
-                command=lambda p=page_num: self.goto_page(p),
-                bg='#34495E',
-                activebackground='#2C3E50',
-                bd=0
-            )
-            thumb_btn.pack()
-            
-            page_num_label = tk.Label(
-                thumb_frame,
-                text=f"{page_num + 1:02d}",
-                font=('Arial', 8),
-                bg='#34495E',
-                fg='white'
-            )
-            page_num_label.pack()
+        # Hashing, worker start-up and thumbnails wait until page 1 is on screen
+        self.root.after_idle(self.finish_open)
     
-    def goto_page(self, page_num):
-        if 0 <= page_num < self.total_pages:
-            self.current_page = page_num
-            self.show_page_with_flip()
-            self.play_page_sound()
+    def clear_document(self):
+        """Back to the empty viewer, e.g. after a failed open already closed the previous document"""
+        if self.pdf_document is not None:
+            self.pdf_document.close()
+        self.pdf_document = None
+        self.bundle = None
+        self.discard_remote()
+        self.file_path = None
+        self.total_pages = 0
+        self.current_page = 0
+        self.displayed_image = None
+        self.wanted_key = None
+        self.page_cache.clear()
+        display_lists.clear()
+        self.tiled_view.hide()
+        self.canvas.delete('page', 'curl', 'search_hit')
+        self.title_label.config(text="Load a PDF to begin")
+        self.page_label.config(text="pages: 0 / 0")
+        self.prev_btn.config(state=tk.DISABLED)
+        self.next_btn.config(state=tk.DISABLED)
     
-    def show_page_with_flip(self):
-        if not self.pdf_document or self.flip_animation_running:
+    def page_area(self):
+        """Largest (width, height) a fitted page may take on the canvas"""
+        self.canvas.update_idletasks()
+        return bucket_area(self.canvas.winfo_width(), self.canvas.winfo_height())
+    
+    def show_first_page(self):
+        """Draw the current page directly, without a flip"""
+        self.wanted_key = self.current_view_key(*self.page_area())
+        self.present_page(self.get_page_image(self.wanted_key))
+        self.page_label.config(text=self.page_label_text())
+    
+    def finish_open(self):
+        if not self.pdf_document:
+            return
+        if self.is_downloading():
+            # Workers, thumbnails and indexing read the whole file; pages render here until it is in
+            self.download_job = self.root.after(DOWNLOAD_POLL_MS, self.poll_download)
             return
         
-        self.flip_animation_running = True
-        self.animate_page_flip_transition()
-    
-    def animate_page_flip_transition(self):
-        """Smooth transition before main flip animation"""
-        self.animate_page_flip()
+        if not self.document_cache and self.open_document_cache():
+            # Hashing reads the whole file, so it runs on the cache's writer thread.
+            # Workers get the cache when they start; until then pages render here uncached
+            self.hash_future = self.disk_cache.document_hash_async(self.file_path)
+            self.hash_job = self.root.after(HASH_POLL_MS, self.poll_hash)
+            return
+        self.start_background_work()
     
-    def animate_page_flip(self):
-        page = self.pdf_document[self.current_page]
+    def poll_hash(self):
+        self.hash_job = None
+        if not self.hash_future.done():
+            self.hash_job = self.root.after(HASH_POLL_MS, self.poll_hash)
+            return
         
-        # Force canvas update to get proper dimensions
-        self.canvas.update_idletasks()
+        try:
+            self.document_cache = self.disk_cache.document(self.hash_future.result())
+        except OSError as e:
+            print(f"Disk cache unavailable: {e}")
+        self.hash_future = None
+        self.start_background_work()
+    
+    def start_background_work(self):
+        """Workers, thumbnails and indexing, once the document and its disk cache are settled"""
+        self.start_workers()
+        self.load_thumbnails()
+        self.thumbnail_list.set_current(self.current_page)
+        self.start_indexing()
+        
+        if self.canvas.winfo_width() > 1:
+            self.schedule_prefetch(*self.page_area())
+    
+    def is_downloading(self):
+        return self.remote is not None and self.pdf_document is self.remote
+    
+    def poll_download(self):
+        self.download_job = None
+        if not self.is_downloading():
+            return
         
-        zoom = fitz.Matrix(self.zoom_level * 2, self.zoom_level * 2)
-        pix = page.get_pixmap(matrix=zoom)
-        img = Image.frombytes("RGB", [pix.width, pix.height], pix.samples)
+        if self.remote.complete():
+            self.finish_download()
+        elif self.remote.downloading():
+            self.download_job = self.root.after(DOWNLOAD_POLL_MS, self.poll_download)
+        else:
+            self.report_download_error()
+    
+    def report_download_error(self):
+        """Offer to retry a failed background download; otherwise pages keep loading as they are shown"""
+        retry = messagebox.askretrycancel(
+            "Download",
+            f"Downloading {url_name(self.remote.url)} stopped: {self.remote.error}\n\n"
+            "Pages are still fetched as you turn to them, but thumbnails and search "
+            "need the whole file."
+        )
+        if retry and self.is_downloading():
+            self.remote.start_download()
+            self.download_job = self.root.after(DOWNLOAD_POLL_MS, self.poll_download)
+    
+    def finish_download(self):
+        """Reopen the finished local copy as an ordinary PDF and start everything that needs the file"""
+        import fitz
+        if self.download_job is not None:
+            self.root.after_cancel(self.download_job)
+            self.download_job = None
+        
+        display_lists.clear()
+        self.remote.close()
+        self.pdf_document = fitz.open(self.remote.path)
+        self.file_path = self.remote.path
+        if self.remote.repaired:
+            # Pages drawn before MuPDF had to repair the partial file may be incomplete
+            self.page_cache.clear()
+            if self.wanted_key is not None and self.zoom_level <= 1.0 and not self.flip_animation:
+                self.present_page(self.get_page_image(self.wanted_key))
+        self.finish_open()
+    
+    def discard_remote(self):
+        """Stop the download of a PDF opened from a URL and delete its local copy"""
+        if self.download_job is not None:
+            self.root.after_cancel(self.download_job)
+            self.download_job = None
+        if self.remote is not None:
+            self.remote.close()
+            self.remote.discard()
+            self.remote = None
+    
+    def ensure_downloaded(self):
+        """Fetch the rest of a PDF opened from a URL; printing and saving need the whole file"""
+        if not self.is_downloading():
+            return
         
-        max_width = self.canvas.winfo_width() - 40
-        max_height = self.canvas.winfo_height() - 40
+        self.root.config(cursor='watch')
+        self.root.update_idletasks()
+        try:
+            self.remote.fetch_all()
+        finally:
+            self.root.config(cursor='')
+        self.finish_download()
+    
+    def open_document_cache(self):
+        """Attach the disk cache if the file's hash is already known; True if it still needs hashing"""
+        self.document_cache = None
+        if self.is_downloading():
+            # Hashing needs every byte; the cache opens once the download completes
+            return False
+        if self.bundle:
+            # Bundle pages are already rendered; caching them again gains nothing
+            return False
         
-        if max_width <= 1 or max_height <= 1:
-            max_width = 1000
-            max_height = 700
+        try:
+            doc_hash = self.disk_cache.known_document_hash(self.file_path)
+        except OSError as e:
+            print(f"Disk cache unavailable: {e}")
+            return False
+        if doc_hash:
+            self.document_cache = self.disk_cache.document(doc_hash)
+        return doc_hash is None
+    
+    def load_thumbnails(self):
+        first_page = self.pdf_document[0].rect if self.total_pages else None
+        aspect = first_page.height / first_page.width if first_page else 1.4
         
-        # Maintain aspect ratio while fitting in canvas
-        img.thumbnail((max_width, max_height), Image.Resampling.LANCZOS)
+        self.thumbnail_list.set_page_count(self.total_pages, aspect, self.thumbnail_engine)
+    
+    def start_workers(self):
+        self.shutdown_workers()
+        if self.bundle:
+            # Bundle pages only need decoding, which the main thread keeps up with
+            return
         
-        # Create 3D flip animation effect
-        self.create_3d_flip_animation(img)
+        try:
+            self.render_pool = RenderPool(self.file_path, self.document_cache)
+            self.thumbnail_engine = ThumbnailRenderEngine(self.render_pool)
+            self.prefetcher = PagePrefetcher(self.render_pool, self.page_cache)
+            self.page_service = PageRenderService(self.render_pool, self.page_cache, self.prefetcher)
+            self.tiled_view.set_pool(self.render_pool)
+        except Exception as e:
+            # Fall back to rendering everything on the main thread
+            print(f"Background rendering unavailable: {e}")
+            self.shutdown_workers()
+    
+    def shutdown_workers(self):
+        if self.hash_job is not None:
+            # A hash still running finishes on the writer thread and is simply ignored
+            self.root.after_cancel(self.hash_job)
+            self.hash_job = None
+        self.hash_future = None
+        if self.prefetch_job is not None:
+            self.root.after_cancel(self.prefetch_job)
+            self.prefetch_job = None
+        self.cancel_page_request()
+        self.cancel_indexing()
+        if self.render_pool:
+            self.render_pool.shutdown()
+        self.render_pool = None
+        self.thumbnail_engine = None
+        self.prefetcher = None
+        self.page_service = None
+        self.tiled_view.set_pool(None)
+    
+    def on_close(self):
+        self.shutdown_workers()
+        if self.pdf_document is not None:
+            self.pdf_document.close()
+        self.discard_remote()
+        self.disk_cache.shutdown()
+        recorder.close()
+        self.root.destroy()
+    
+    def schedule_prefetch(self, max_width, max_height):
+        """Render the neighbours of the current page in the background"""
+        if self.is_downloading():
+            # Nothing renders in the background yet, but the neighbours' bytes can arrive early
+            self.remote.prefetch(neighbour_pages(self.current_page, self.total_pages, 2, 1, self.spread_mode))
+            return
+        if not self.prefetcher:
+            return
         
-        self.page_label.config(text=f"pages: {self.current_page + 1} / {self.total_pages}")
+        self.prefetcher.update(
+            self.current_page,
+            self.total_pages,
+            round(self.zoom_level, 2),
+            max_width,
+            max_height,
+            self.spread_mode
+        )
+        if self.prefetch_job is None and self.prefetcher.busy():
+            self.prefetch_job = self.root.after(50, self.poll_prefetch)
+    
+    def poll_prefetch(self):
+        self.prefetch_job = None
+        if not self.prefetcher:
+            return
         
-        self.flip_animation_running = False
+        self.prefetcher.poll()
+        if self.prefetcher.busy():
+            self.prefetch_job = self.root.after(50, self.poll_prefetch)
     
-    def create_3d_flip_animation(self, img):
-        """Create realistic 3D page flip animation"""
-        frames = 15  # Number of animation frames
+    def search_index_path(self):
+        return os.path.join(self.document_cache.directory, INDEX_FILE) if self.document_cache else None
+    
+    def start_indexing(self):
+        """Load the saved search index, or build it in the background"""
+        if self.bundle:
+            # Built along with the bundle; there is no text left to index
+            self.search_index = self.bundle.search_index()
+            self.update_search_label()
+            return
         
-        for i in range(frames):
-            progress = i / frames
-            
-            # Calculate perspective transformation
-            angle = progress * 180  # 0 to 180 degrees
-            
-            # Create flipped image with perspective
-            flipped_img = self.apply_3d_perspective(img, angle, progress)
-            
-            photo = ImageTk.PhotoImage(flipped_img)
-            
-            self.canvas.delete('all')
-            
-            x = max(self.canvas.winfo_width() // 2, flipped_img.width // 2 + 20)
-            y = max(self.canvas.winfo_height() // 2, flipped_img.height // 2 + 20)
-            
-            self.canvas.create_image(x, y, image=photo, anchor='center')
-            self.canvas.image = photo
-            
-            self.root.update()
-            self.root.after(30)  # Smooth animation delay
+        path = self.search_index_path()
+        self.search_index = SearchIndex.load(path) if path else SearchIndex()
+        if self.search_index.is_complete(self.total_pages):
+            return
         
-        # Final image with curl effect
-        curl_img = self.add_page_curl_effect(img)
-        photo = ImageTk.PhotoImage(curl_img)
+        if self.render_pool:
+            self.indexer = SearchIndexer(self.render_pool, self.search_index, self.total_pages)
+            self.indexer.fill()
+            self.index_job = self.root.after(100, self.poll_indexer)
+        else:
+            self.index_job = self.root.after_idle(self.index_next)
+        self.update_search_label()
+    
+    def poll_indexer(self):
+        self.index_job = None
+        if not self.indexer:
+            return
         
-        self.canvas.delete('all')
+        if self.indexer.poll() and self.search_query.strip():
+            # Pages indexed since the last keystroke may match too
+            self.run_search()
         
-        x = max(self.canvas.winfo_width() // 2, curl_img.width // 2 + 20)
-        y = max(self.canvas.winfo_height() // 2, curl_img.height // 2 + 20)
+        if self.indexer.busy():
+            self.index_job = self.root.after(100, self.poll_indexer)
+        else:
+            self.indexer = None
+            self.finish_indexing()
+    
+    def index_next(self):
+        """Main-thread fallback: index one page, then yield to the event loop"""
+        self.index_job = None
+        missing = next((p for p in range(self.total_pages) if p not in self.search_index.indexed_pages), None)
+        if missing is None:
+            self.finish_indexing()
+            return
         
-        self.canvas.create_image(x, y, image=photo, anchor='center')
-        self.canvas.image = photo
+        words = self.pdf_document[missing].get_text('words')
+        self.search_index.add_page(missing, normalize_words(w[4] for w in words))
+        self.index_job = self.root.after(1, self.index_next)
+    
+    def finish_indexing(self):
+        path = self.search_index_path()
+        if path:
+            self.disk_cache.run_async(self.search_index.save, path)
+        self.run_search()
     
-    def apply_3d_perspective(self, img, angle, progress):
-        """Apply 3D perspective transformation to simulate page turning"""
-        width, height = img.size
+    def cancel_indexing(self):
+        if self.index_job is not None:
+            self.root.after_cancel(self.index_job)
+            self.index_job = None
+        if self.indexer:
+            self.indexer.cancel()
+            self.indexer = None
+    
+    def schedule_search(self):
+        """Search shortly after typing pauses rather than on every keystroke"""
+        if self.search_job is not None:
+            self.root.after_cancel(self.search_job)
+        self.search_job = self.root.after(120, self.run_search)
+    
+    def run_search(self):
+        self.search_job = None
+        self.search_query = self.search_var.get()
+        if self.search_index and self.search_query.strip():
+            self.search_hits = self.search_index.search(self.search_query)
+        else:
+            self.search_hits = []
+        self.update_search_label()
+        self.draw_search_hits(self.wanted_key)
+    
+    def update_search_label(self):
+        if not self.search_query.strip():
+            text = "🔍"
+        else:
+            count = len(self.search_hits)
+            text = f"{count} page{'s' if count != 1 else ''}"
+        if self.search_index and not self.search_index.is_complete(self.total_pages):
+            text += f"  (indexing {len(self.search_index.indexed_pages)}/{self.total_pages})"
+        self.search_label.config(text=text)
+    
+    def next_search_hit(self, step):
+        """Jump to the next (or previous) page with a match, wrapping around"""
+        if self.search_job is not None:
+            self.root.after_cancel(self.search_job)
+            self.run_search()
+        if not self.search_hits:
+            return
         
-        # Calculate perspective scale
-        scale_x = abs(math.cos(math.radians(angle)))
+        pages = self.visible_pages()
+        if step > 0:
+            target = next((p for p in self.search_hits if p > pages[-1]), self.search_hits[0])
+        else:
+            target = next((p for p in reversed(self.search_hits) if p < pages[0]), self.search_hits[-1])
+        self.goto_page(target)
+    
+    def draw_search_hits(self, key):
+        """Outline matches of the query on the page or spread on screen"""
+        self.canvas.delete('search_hit')
+        query = self.search_query.strip()
+        if not query or key is None or not self.pdf_document or self.tiled_view.active:
+            return
+        if self.bundle:
+            # Bundles keep which pages match, not where on the page
+            return
         
-        # Create new image with perspective
-        new_width = max(int(width * scale_x), 1)
+        page_keys = spread_page_keys(key) if is_spread_key(key) else [key]
+        sizes = [fitted_size(self.pdf_document[k[0]].rect, *k[1:]) for k in page_keys]
+        spread_height = max(height for _, height in sizes)
+        
+        x, top = self.image_origin
+        for page_key, (width, height) in zip(page_keys, sizes):
+            page = self.pdf_document[page_key[0]]
+            scale = width / page.rect.width
+            y = top + (spread_height - height) // 2
+            for rect in page.search_for(query):
+                self.canvas.create_rectangle(
+                    x + rect.x0 * scale - 1, y + rect.y0 * scale - 1,
+                    x + rect.x1 * scale + 1, y + rect.y1 * scale + 1,
+                    outline='#F1C40F',
+                    width=2,
+                    tags='search_hit'
+                )
+            x += width
+        self.perf_hud.draw()
+    
+    def render_thumbnail(self, page_num, max_width, max_height):
+        """Rasterize one page so it fits inside the thumbnail box"""
+        if self.bundle:
+            return self.bundle.thumbnail(page_num, max_width, max_height)
         
-        if new_width < 5:
-            new_width = 5
+        img = render_thumbnail(self.pdf_document[page_num], max_width, max_height)
         
-        # Resize with perspective effect
-        perspective_img = img.resize((new_width, height), Image.Resampling.LANCZOS)
+        if self.document_cache:
+            key = thumbnail_cache_key(page_num, max_width, max_height)
+            self.disk_cache.put_async(self.document_cache, key, img)
+        return img
+    
+    def cached_thumbnail(self, page_num, max_width, max_height):
+        if not self.document_cache:
+            return None
+        return self.document_cache.get(thumbnail_cache_key(page_num, max_width, max_height))
+    
+    def visible_pages(self):
+        if self.spread_mode:
+            return spread_pages(self.current_page, self.total_pages)
+        return (self.current_page,)
+    
+    def current_view_key(self, max_width, max_height):
+        return view_key(
+            self.current_page,
+            self.total_pages,
+            round(self.zoom_level, 2),
+            max_width,
+            max_height,
+            self.spread_mode
+        )
+    
+    def page_label_text(self):
+        pages = self.visible_pages()
+        shown = '-'.join(str(p + 1) for p in pages)
+        return f"pages: {shown} / {self.total_pages}"
+    
+    def goto_page(self, page_num):
+        if 0 <= page_num < self.total_pages:
+            if self.spread_mode:
+                page_num = spread_pages(page_num, self.total_pages)[0]
+            self.flip_direction = 1 if page_num >= self.current_page else -1
+            self.current_page = page_num
+            self.show_page_with_flip()
+            self.play_page_sound()
+    
+    def show_page_with_flip(self):
+        if not self.pdf_document:
+            return
         
-        # Create canvas for final image
-        canvas_img = Image.new('RGB', (width, height), color=(139, 157, 168))
+        self.cancel_refit()
+        if self.flip_job is not None:
+            # Presses that arrive before the next idle collapse into one flip
+            return
+        if self.flip_animation and self.zoom_level <= 1.0:
+            # Presses during a flip retarget it, so next/next/next is one turn to the last page
+            self.retarget_flip()
+            return
         
-        # Calculate position to center the perspective image
-        x_offset = (width - new_width) // 2
+        if self.flip_animation:
+            self.flip_animation.finish(draw=False)
+        self.flip_job = self.root.after_idle(self.animate_page_flip_transition)
+    
+    def animate_page_flip_transition(self):
+        """Smooth transition before main flip animation"""
+        self.flip_job = None
+        if not self.pdf_document:
+            return
         
-        # Paste perspective image
-        canvas_img.paste(perspective_img, (x_offset, 0))
+        if self.zoom_level > 1.0:
+            self.cancel_page_request()
+            self.show_tiled_page()
+        else:
+            self.tiled_view.hide()
+            self.animate_page_flip()
+    
+    def show_tiled_page(self):
+        self.canvas.update_idletasks()
         
-        # Add shadow effect for depth
-        shadow_img = self.add_flip_shadow(canvas_img, progress, angle)
+        max_width, max_height = self.page_area()
+        page_rect = self.pdf_document[self.current_page].rect
+        scale = fitted_scale(page_rect, 1.0, max_width, max_height) * self.zoom_level
         
-        return shadow_img
+        self.tiled_view.show(self.current_page, page_rect, scale)
+        self.update_page_indicators()
     
-    def add_flip_shadow(self, img, progress, angle):
-        """Add shadow effect during page flip for realism"""
-        shadow_img = img.copy()
-        draw = ImageDraw.Draw(shadow_img)
-        
-        width, height = img.size
+    def update_page_indicators(self):
+        self.page_label.config(text=self.page_label_text())
+        self.thumbnail_list.set_current(self.current_page)
+    
+    def render_tile(self, page_num, scale, tile_x, tile_y, tile_size):
+        if self.bundle:
+            return self.bundle.render_tile(page_num, scale, tile_x, tile_y, tile_size)
+        return render_tile(self.pdf_document[page_num], scale, tile_x, tile_y, tile_size)
+    
+    def animate_page_flip(self):
+        max_width, max_height = self.page_area()
+        key = self.current_view_key(max_width, max_height)
+        self.wanted_key = key
         
-        # Shadow intensity based on flip progress
-        if angle < 90:
-            # Left side shadow (page leaving)
-            shadow_alpha = int(100 * (1 - progress))
-            for i in range(int(width * 0.2)):
-                alpha = shadow_alpha * (1 - i / (width * 0.2))
-                gray = int(200 - alpha * 0.5)
-                draw.line([(i, 0), (i, height)], fill=(gray, gray, gray))
-        else:
-            # Right side shadow (page arriving)
-            shadow_alpha = int(100 * progress)
-            for i in range(int(width * 0.2)):
-                pos = width - i - 1
-                alpha = shadow_alpha * (1 - i / (width * 0.2))
-                gray = int(200 - alpha * 0.5)
-                draw.line([(pos, 0), (pos, height)], fill=(gray, gray, gray))
-        
-        return shadow_img
-    
-    def add_page_curl_effect(self, img):
-        """Enhanced realistic page curl effect with gradient shadows"""
-        width, height = img.size
-        
-        curl_img = img.copy()
-        draw = ImageDraw.Draw(curl_img)
-        
-        # Larger, more realistic curl
-        curl_width = int(width * 0.18)
-        curl_height = int(height * 0.30)
-        
-        # Main curl shadow with gradient
-        shadow_polygon = [
-            (width - curl_width, height - curl_height),
-            (width, height - curl_height // 3),
-            (width, height),
-            (width - curl_width // 3, height)
-        ]
+        # Create 3D flip animation effect
+        self.create_3d_flip_animation(self.flip_page_image(key))
         
-        # Enhanced shadow layers for depth
-        for i in range(40):
-            offset = i * 1.5
-            alpha = int(140 - (i * 3.5))
-            gray = 170 - (i * 4)
-            
-            offset_polygon = [
-                (shadow_polygon[0][0] + offset, shadow_polygon[0][1] + offset),
-                (shadow_polygon[1][0], shadow_polygon[1][1] + offset // 2),
-                shadow_polygon[2],
-                (shadow_polygon[3][0] + offset // 2, shadow_polygon[3][1])
-            ]
+        self.update_page_indicators()
+        self.root.after_idle(self.schedule_prefetch, max_width, max_height)
+    
+    def retarget_flip(self):
+        """Land the running flip on the current page instead of starting another"""
+        self.flip_direction = 1
+        max_width, max_height = self.page_area()
+        key = self.current_view_key(max_width, max_height)
+        self.wanted_key = key
+        self.flip_target = self.flip_page_image(key)
+        
+        self.update_page_indicators()
+        self.root.after_idle(self.schedule_prefetch, max_width, max_height)
+    
+    def flip_page_image(self, key):
+        """The page to flip to: cached, a placeholder while it renders, or rendered here"""
+        with recorder.stage('page_image'):
+            img = self.lookup_page_image(key)
+            if img is not None:
+                # Whatever was still rendering is stale now
+                self.cancel_page_request()
+            elif self.page_service:
+                # Flip with a stand-in now; the full render swaps in when it lands
+                img = self.placeholder_image(key)
+                recorder.count('placeholders')
+                self.request_page(key)
+            else:
+                img = self.get_page_image(key)
+        return img
+    
+    def lookup_page_image(self, key):
+        """Return an already rendered page or spread from memory or disk, else None"""
+        img = self.page_cache.get(key)
+        if img is not None or not self.document_cache:
+            return img
+        
+        # Reopened documents usually have the pages on disk already
+        halves = []
+        for page_key in spread_page_keys(key) if is_spread_key(key) else [key]:
+            half = self.document_cache.get(page_cache_key(*page_key))
+            if half is None:
+                return None
+            halves.append(half)
+        
+        img = compose_spread(halves)
+        self.page_cache.put(key, img)
+        return img
+    
+    def get_page_image(self, key):
+        """Return the fitted page or spread image, rendering it here on a cache miss"""
+        img = self.lookup_page_image(key)
+        if img is not None:
+            return img
+        
+        halves = []
+        for page_key in spread_page_keys(key) if is_spread_key(key) else [key]:
+            if self.bundle:
+                size = fitted_size(self.bundle.page_rect(page_key[0]), *page_key[1:])
+                halves.append(self.bundle.page_image(page_key[0], size))
+                continue
             
-            draw.polygon(offset_polygon, fill=(gray, gray, gray))
-        
-        # Curl fold with realistic lighting
-        curl_polygon = [
-            (width - curl_width, height - curl_height),
-            (width - 8, height - curl_height // 4),
-            (width - 3, height - 8),
-            (width - curl_width // 2, height - 3)
-        ]
+            half = render_fitted_page(self.pdf_document[page_key[0]], *page_key[1:])
+            if self.document_cache:
+                self.disk_cache.put_async(self.document_cache, page_cache_key(*page_key), half)
+            halves.append(half)
+        
+        img = compose_spread(halves)
+        self.page_cache.put(key, img)
+        return img
+    
+    def placeholder_image(self, key):
+        """Upscaled thumbnails (or blank sheets) at the size the view will have"""
+        if is_spread_key(key):
+            return compose_spread([self.placeholder_image(k) for k in spread_page_keys(key)])
+        
+        page_num = key[0]
+        size = fitted_size(self.pdf_document[page_num].rect, *key[1:])
+        
+        thumb = self.cached_thumbnail(
+            page_num, VirtualThumbnailList.THUMB_WIDTH, self.thumbnail_list.thumb_height)
+        if thumb is None:
+            return Image.new('RGB', size, 'white')
+        return thumb.resize(size, Image.Resampling.BILINEAR)
+    
+    def request_page(self, key):
+        """Render key in the background, superseding any older request"""
+        self.page_service.request(key)
+        if self.page_job is None:
+            self.page_job = self.root.after(15, self.poll_page_request)
+    
+    def poll_page_request(self):
+        self.page_job = None
+        if not self.page_service:
+            return
         
-        # Gradient on curl surface
-        for i in range(20):
-            gray = 230 - (i * 6)
-            offset_curl = [
-                (curl_polygon[0][0] + i, curl_polygon[0][1] + i),
-                (curl_polygon[1][0] - i//2, curl_polygon[1][1] + i//3),
-                (curl_polygon[2][0] - i//3, curl_polygon[2][1] - i//3),
-                (curl_polygon[3][0] + i//2, curl_polygon[3][1] - i//4)
-            ]
-            draw.polygon(offset_curl, fill=(gray, gray, min(gray + 15, 255)))
+        finished = self.page_service.poll()
+        if finished:
+            self.show_rendered_page(*finished)
+        elif self.page_service.busy():
+            self.page_job = self.root.after(15, self.poll_page_request)
+    
+    def show_rendered_page(self, key, img):
+        """Swap a finished render in for its placeholder"""
+        if key != self.wanted_key:
+            return
         
-        # Bright highlight on curl edge
-        highlight_line = [
-            (width - curl_width, height - curl_height),
-            (width - curl_width // 2, height - 5)
-        ]
-        draw.line(highlight_line, fill=(250, 250, 250), width=4)
+        if self.flip_animation:
+            # The running flip lands on the real page instead
+            self.flip_target = img
+        else:
+            self.present_page(img)
+    
+    def cancel_page_request(self):
+        if self.page_job is not None:
+            self.root.after_cancel(self.page_job)
+            self.page_job = None
+        if self.page_service:
+            self.page_service.cancel()
+    
+    def create_3d_flip_animation(self, img):
+        """Start a realistic 3D page flip animation driven by the event loop"""
+        direction, self.flip_direction = self.flip_direction, 1
         
-        # Curl edge definition
-        edge_line = [
-            (width - 10, height - curl_height // 4),
-            (width - 4, height - 10)
-        ]
-        draw.line(edge_line, fill=(180, 180, 185), width=3)
+        # The previous page turns over (or the new one drops onto it)
+        engine = self.flip_quality.engine(img, self.displayed_image, direction)
+        self.flip_target = img
         
-        # Add subtle inner shadow for depth
-        inner_shadow = [
-            (width - curl_width + 5, height - curl_height + 5),
-            (width - 15, height - curl_height // 3 + 5)
-        ]
-        draw.line(inner_shadow, fill=(140, 140, 140), width=2)
+        def draw_frame(progress):
+            start = time.perf_counter()
+            # Create flipped image with perspective
+            with recorder.stage('effects'):
+                frame = apply_3d_perspective(engine, progress)
+            with recorder.stage('upscale'):
+                frame = engine.to_display(frame)
+            self.display_image(frame)
+            frame_ms = (time.perf_counter() - start) * 1000
+            self.flip_quality.record(frame_ms)
+            recorder.frame(frame_ms)
+        
+        self.flip_animation = FrameScheduler(
+            self.root,
+            FLIP_DURATION,
+            draw_frame,
+            self.finish_flip,
+            self.flip_quality.tier.interval
+        )
+        self.flip_animation.start()
+    
+    def finish_flip(self, draw=True):
+        if draw and self.flip_animation:
+            recorder.count('dropped_frames', self.flip_animation.dropped_frames)
+        change = self.flip_quality.end_flip()
+        if change:
+            recorder.count('flip_quality_up' if change > 0 else 'flip_quality_down')
+        img = self.flip_target
+        self.flip_animation = None
+        self.flip_target = None
+        self.displayed_image = img
+        
+        if draw:
+            self.present_page(img)
+    
+    def present_page(self, img):
+        """Show the settled page or spread with its curl and search hits"""
+        self.displayed_image = img
+        self.display_image(img)
+        
+        # The curl is its own canvas item, so the page bitmap needs no copy
+        with recorder.stage('curl'):
+            self.draw_page_curl(img.size)
+        self.draw_search_hits(self.wanted_key)
+    
+    def display_image(self, img):
+        """Show img centred on the canvas, without curl or search overlays.
+        
+        Flip frames and settled pages of the same size are pasted into one
+        PhotoImage and one canvas item instead of recreating both each time.
+        """
+        with recorder.stage('photoimage'):
+            photo = self.page_photo
+            if photo is None or (photo.width(), photo.height()) != img.size:
+                photo = self.page_photo = ImageTk.PhotoImage(img)
+            else:
+                photo.paste(img)
         
-        return curl_img
+        with recorder.stage('canvas'):
+            x = max(self.canvas.winfo_width() // 2, img.width // 2 + 20)
+            y = max(self.canvas.winfo_height() // 2, img.height // 2 + 20)
+            
+            # The tiled view clears the canvas, taking the page item with it
+            if self.canvas.find_withtag('page'):
+                self.canvas.coords('page', x, y)
+                self.canvas.itemconfigure('page', image=photo)
+            else:
+                self.canvas.create_image(x, y, image=photo, anchor='center', tags='page')
+                self.canvas.tag_lower('page')
+            self.canvas.itemconfigure('curl', state='hidden')
+            self.canvas.delete('search_hit')
+            self.image_origin = (x - img.width // 2, y - img.height // 2)
+        self.perf_hud.draw()
+    
+    def draw_page_curl(self, size):
+        """Overlay the cached curl sprite on the bottom-right of the page"""
+        if self.curl_photo is None or self.curl_photo[0] != size:
+            sprite, position = page_curl_sprite(*size)
+            self.curl_photo = (size, ImageTk.PhotoImage(sprite), position)
+        
+        _, photo, (left, top) = self.curl_photo
+        x, y = self.image_origin[0] + left, self.image_origin[1] + top
+        if self.canvas.find_withtag('curl'):
+            self.canvas.coords('curl', x, y)
+            self.canvas.itemconfigure('curl', image=photo, state='normal')
+        else:
+            self.canvas.create_image(x, y, image=photo, anchor='nw', tags='curl')
+        self.canvas.tag_raise('curl', 'page')
     
     def prev_page(self):
         if self.current_page > 0:
-            self.current_page -= 1
+            if self.spread_mode:
+                previous = spread_pages(self.current_page, self.total_pages)[0] - 1
+                self.current_page = spread_pages(previous, self.total_pages)[0]
+            else:
+                self.current_page -= 1
+            self.flip_direction = -1
             self.show_page_with_flip()
             self.play_page_sound()
     
     def next_page(self):
-        if self.current_page < self.total_pages - 1:
-            self.current_page += 1
+        following = self.visible_pages()[-1] + 1
+        if following < self.total_pages:
+            self.current_page = following
             self.show_page_with_flip()
             self.play_page_sound()
     
-    def zoom_in(self):
-        self.zoom_level = min(self.zoom_level + 0.2, 3.0)
+    def toggle_spread(self):
+        """Switch between single pages and two-page book spreads"""
+        self.spread_mode = not self.spread_mode
+        self.spread_btn.config(text="📄 Single" if self.spread_mode else "📖 Spread")
         if self.pdf_document:
+            self.current_page = self.visible_pages()[0]
             self.show_page_with_flip()
     
+    def zoom_in(self):
+        if self.zoom_level >= 1.0:
+            # Deep zoom grows geometrically
+            self.zoom_level = min(round(self.zoom_level * 1.25, 3), MAX_ZOOM)
+        else:
+            self.zoom_level = min(round(self.zoom_level + 0.2, 2), 1.0)
+        self.show_zoom()
+    
     def zoom_out(self):
-        self.zoom_level = max(self.zoom_level - 0.2, 0.5)
-        if self.pdf_document:
-            self.show_page_with_flip()
+        if self.zoom_level > 1.0:
+            self.zoom_level = max(round(self.zoom_level / 1.25, 3), 1.0)
+        else:
+            self.zoom_level = max(round(self.zoom_level - 0.2, 2), 0.5)
+        self.show_zoom()
+    
+    def show_zoom(self):
+        """Rescale the page on screen at once; render it sharp once clicks stop.
+        
+        The preview is always scaled from the last sharp page, so a burst of
+        clicks never compounds blur, and only the final zoom level is rendered.
+        """
+        if not self.pdf_document or self.flip_job is not None:
+            # A pending flip renders at the new zoom anyway
+            return
+        if self.flip_animation:
+            self.flip_animation.finish()
+        
+        # The deep-zoom view renders its own tiles; only the fitted page is rescaled
+        if not self.tiled_view.active and self.displayed_image is not None:
+            key = self.current_view_key(*self.page_area())
+            self.wanted_key = key
+            with recorder.stage('zoom_preview'):
+                preview = self.displayed_image.resize(self.view_size(key), Image.Resampling.BILINEAR)
+            self.display_image(preview)
+        
+        self.schedule_refit(ZOOM_SETTLE_MS)
+    
+    def view_size(self, key):
+        """Display size of the page or spread for key"""
+        page_keys = spread_page_keys(key) if is_spread_key(key) else [key]
+        sizes = [fitted_size(self.pdf_document[k[0]].rect, *k[1:]) for k in page_keys]
+        return sum(width for width, _ in sizes), max(height for _, height in sizes)
+    
+    def on_canvas_configure(self, event):
+        """Keep the page fitted while the window is resized or goes fullscreen.
+        
+        Every event only rescales the page already on screen; the sharp
+        render waits until resizing has paused, and is skipped entirely when
+        the size stays within the same bucket.
+        """
+        size = (event.width, event.height)
+        if size == self.canvas_size:
+            return
+        self.canvas_size = size
+        if not self.pdf_document:
+            return
+        
+        # Events arriving before the next idle share one preview
+        if self.resize_preview_job is None:
+            self.resize_preview_job = self.root.after_idle(self.preview_resize)
+        self.schedule_refit(RESIZE_SETTLE_MS)
+    
+    def preview_resize(self):
+        self.resize_preview_job = None
+        if not self.pdf_document or self.displayed_image is None:
+            return
+        if self.flip_animation or self.tiled_view.active:
+            return
+        
+        # Within a bucket the size is unchanged and the page is only re-centred
+        size = self.view_size(self.current_view_key(*bucket_area(*self.canvas_size)))
+        with recorder.stage('resize_preview'):
+            preview = self.displayed_image
+            if preview.size != size:
+                preview = preview.resize(size, Image.Resampling.BILINEAR)
+        self.display_image(preview)
+    
+    def schedule_refit(self, delay):
+        if self.refit_job is not None:
+            self.root.after_cancel(self.refit_job)
+        self.refit_job = self.root.after(delay, self.refit_page)
+    
+    def refit_page(self):
+        """Show the current view sharp at the settled zoom and canvas size, without a flip"""
+        self.refit_job = None
+        if not self.pdf_document or self.flip_job is not None:
+            # A pending flip renders at the new size anyway
+            return
+        if self.flip_animation:
+            self.flip_animation.finish()
+        
+        if self.zoom_level > 1.0:
+            self.cancel_page_request()
+            self.show_tiled_page()
+            return
+        
+        self.tiled_view.hide()
+        max_width, max_height = self.page_area()
+        key = self.current_view_key(max_width, max_height)
+        self.wanted_key = key
+        img = self.lookup_page_image(key)
+        if img is not None:
+            self.cancel_page_request()
+            self.present_page(img)
+        elif self.page_service:
+            # show_rendered_page swaps it in over the preview
+            self.request_page(key)
+        else:
+            self.present_page(self.get_page_image(key))
+        self.root.after_idle(self.schedule_prefetch, max_width, max_height)
+    
+    def cancel_refit(self):
+        if self.refit_job is not None:
+            self.root.after_cancel(self.refit_job)
+            self.refit_job = None
     
     def toggle_fullscreen(self):
         self.is_fullscreen = not self.is_fullscreen
@@ -529,36 +1878,91 @@ class FlipbookPDFViewer:
             self.root.bind('<Escape>', lambda e: self.toggle_fullscreen())
         else:
             self.root.unbind('<Escape>')
+        # The canvas <Configure> that follows re-fits the page without a flip
     
     def print_pdf(self):
         if not self.pdf_document:
             messagebox.showwarning("No PDF", "Please load a PDF first!")
             return
+        if self.bundle:
+            messagebox.showinfo("Bundle", "This catalogue is a pre-rendered bundle.\nOpen the original PDF to print or download it.")
+            return
+        
+        page_range = simpledialog.askstring(
+            "Print",
+            f"Pages to print (e.g. 1-3, 7 or 'current' for the pages on screen), 1-{self.total_pages}.\n"
+            "Leave blank to print all pages.",
+            initialvalue='current',
+            parent=self.root
+        )
+        if page_range is None:
+            return
+        
+        try:
+            pages = parse_page_ranges(page_range, self.total_pages, self.visible_pages())
+        except ValueError:
+            messagebox.showwarning("Print", f"Could not read page range: {page_range}")
+            return
         
         try:
             import platform
-            import tempfile
             
-            temp_pdf = tempfile.NamedTemporaryFile(delete=False, suffix='.pdf')
-            self.pdf_document.save(temp_pdf.name)
-            temp_pdf.close()
+            self.ensure_downloaded()
+            print_path = self.write_print_file(pages)
             
             system = platform.system()
             if system == 'Windows':
-                os.startfile(temp_pdf.name, 'print')
+                os.startfile(print_path, 'print')
             elif system == 'Darwin':
-                subprocess.run(['lpr', temp_pdf.name])
+                subprocess.run(['lpr', print_path])
             else:
-                subprocess.run(['lp', temp_pdf.name])
+                subprocess.run(['lp', print_path])
             
             messagebox.showinfo("Print", "PDF sent to default printer!")
         except Exception as e:
             messagebox.showwarning("Print Error", f"Could not print: {e}\n\nPlease download and print manually.")
     
+    def write_print_file(self, pages):
+        """Path of a PDF holding just the pages to print"""
+        import fitz
+        import tempfile
+        
+        if len(pages) == self.total_pages and not self.pdf_document.is_dirty:
+            # The original file already is exactly what gets printed
+            return self.file_path
+        
+        temp_pdf = tempfile.NamedTemporaryFile(delete=False, suffix='.pdf')
+        temp_pdf.close()
+        
+        # Copy only the selected pages' objects rather than re-serializing everything
+        subset = fitz.open()
+        for first, last in page_runs(pages):
+            subset.insert_pdf(self.pdf_document, from_page=first, to_page=last)
+        subset.save(temp_pdf.name)
+        subset.close()
+        return temp_pdf.name
+    
+    def save_document_copy(self, save_path):
+        """Write the document to save_path as cheaply as its state allows"""
+        if os.path.exists(save_path) and os.path.samefile(save_path, self.file_path):
+            if self.pdf_document.is_dirty:
+                # Append only the changes to the file we opened
+                self.pdf_document.saveIncr()
+            return
+        
+        if not self.pdf_document.is_dirty:
+            # Unmodified: copy the original bytes (sendfile/CopyFile where available)
+            shutil.copyfile(self.file_path, save_path)
+        else:
+            self.pdf_document.save(save_path)
+    
     def download_pdf(self):
         if not self.pdf_document:
             messagebox.showwarning("No PDF", "Please load a PDF first!")
             return
+        if self.bundle:
+            messagebox.showinfo("Bundle", "This catalogue is a pre-rendered bundle.\nOpen the original PDF to print or download it.")
+            return
         
         save_path = filedialog.asksaveasfilename(
             defaultextension=".pdf",
@@ -567,7 +1971,8 @@ class FlipbookPDFViewer:
         
         if save_path:
             try:
-                self.pdf_document.save(save_path)
+                self.ensure_downloaded()
+                self.save_document_copy(save_path)
                 messagebox.showinfo("Success", f"PDF saved to:\n{save_path}")
             except Exception as e:
                 messagebox.showerror("Error", f"Failed to save PDF: {e}")
@@ -619,9 +2024,37 @@ class FlipbookPDFViewer:
                 messagebox.showerror("Error", f"Failed to start build: {e}")
 
 def main():
+    parser = argparse.ArgumentParser(description="PDF Flipbook Viewer")
+    parser.add_argument('file', nargs='?', help=f"PDF, {BUNDLE_EXTENSION} bundle or http(s) URL of a PDF to open")
+    parser.add_argument('--hud', action='store_true', help="show the frame-timing overlay (toggle with F3)")
+    parser.add_argument('--trace', metavar='PATH', help="append stage timings to a .csv or JSON-lines file")
+    parser.add_argument('--measure-startup', action='store_true', help="print the startup time and exit")
+    args = parser.parse_args()
+    show_hud = configure_from_env(args.hud, args.trace)
+    
     root = tk.Tk()
     app = FlipbookPDFViewer(root)
+    root.protocol("WM_DELETE_WINDOW", app.on_close)
+    if show_hud:
+        app.perf_hud.set_visible(True)
+    
+    def window_shown():
+        app.startup_time = (time.perf_counter() - STARTED) * 1000
+        recorder.record('startup', app.startup_time, kind='open')
+        if args.measure_startup:
+            print(f"Startup: {app.startup_time:.0f} ms")
+            app.on_close()
+    
+    root.update_idletasks()
+    root.after_idle(window_shown)
+    
+    # A kiosk build opens its embedded catalogue straight away
+    file_path = args.file or embedded_bundle()
+    if file_path:
+        root.after_idle(app.open_document, file_path)
     root.mainloop()
 
 if __name__ == "__main__":
+    # Needed for the render worker processes in the packaged exe
+    multiprocessing.freeze_support()
     main()
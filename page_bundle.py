@@ -0,0 +1,205 @@
+"""Pre-rendered flipbook bundles that open without PyMuPDF.
+
+A bundle is one file holding every page as a small pyramid of encoded
+images at a few fixed sizes, a thumbnail per page and the search index,
+followed by a JSON manifest with the offset of each image:
+
+    MAGIC | manifest offset (8 bytes) | image data ... | manifest
+
+The viewer memory-maps the file and decodes only the pages it shows, so a
+catalogue opens as fast as the first JPEG decodes. build_bundle.py writes
+bundles from a PDF.
+"""
+import io
+import json
+import math
+import mmap
+import os
+import struct
+import tempfile
+from collections import OrderedDict, namedtuple
+
+from PIL import Image
+
+from search_index import SearchIndex
+
+BUNDLE_VERSION = 1
+BUNDLE_EXTENSION = '.flipbook'
+MAGIC = b'FLIPBK01'
+HEADER = struct.Struct('<8sQ')
+DEFAULT_SIZES = (1200, 2400)  # longest side of each pyramid level, in pixels
+THUMB_SIZE = 320
+DECODED_LEVELS = 4  # decoded images kept for tile and resize requests
+
+PageRect = namedtuple('PageRect', 'width height')
+
+def is_bundle(path):
+    return path.lower().endswith(BUNDLE_EXTENSION)
+
+def encode_image(img, image_format, quality):
+    buffer = io.BytesIO()
+    img.save(buffer, image_format, quality=quality)
+    return buffer.getvalue()
+
+class BundleWriter:
+    """Appends encoded images in any order, then writes the manifest"""
+    
+    def __init__(self, path, page_count, image_format, source=None):
+        self.path = path
+        directory = os.path.dirname(os.path.abspath(path))
+        fd, self.temp_path = tempfile.mkstemp(dir=directory, suffix='.tmp')
+        self.file = os.fdopen(fd, 'wb')
+        self.file.write(HEADER.pack(MAGIC, 0))
+        self.manifest = {
+            'version': BUNDLE_VERSION,
+            'source': source,
+            'format': image_format,
+            'pages': [None] * page_count,
+        }
+    
+    def append(self, data):
+        """Write one blob and return its [offset, length]"""
+        offset = self.file.tell()
+        self.file.write(data)
+        return [offset, len(data)]
+    
+    def add_page(self, page_num, width, height, levels, thumbnail):
+        """levels and thumbnail are (width, height, encoded bytes) tuples"""
+        self.manifest['pages'][page_num] = {
+            'width': width,
+            'height': height,
+            'levels': [[w, h] + self.append(data) for w, h, data in levels],
+            'thumb': [thumbnail[0], thumbnail[1]] + self.append(thumbnail[2]),
+        }
+    
+    def finish(self, search_index=None):
+        if search_index is not None:
+            self.manifest['search'] = self.append(json.dumps(search_index.to_dict(), separators=(',', ':')).encode())
+        
+        manifest_offset = self.file.tell()
+        self.file.write(json.dumps(self.manifest, separators=(',', ':')).encode())
+        self.file.seek(0)
+        self.file.write(HEADER.pack(MAGIC, manifest_offset))
+        self.file.close()
+        os.replace(self.temp_path, self.path)
+    
+    def abort(self):
+        self.file.close()
+        os.remove(self.temp_path)
+
+class PageBundle:
+    """Read-only view of a bundle file with lazy, memory-mapped page reads.
+    
+    Pages are fitted the same way render_pool fits PDF pages, from the
+    smallest pyramid level that is at least as large as the request.
+    """
+    
+    is_dirty = False
+    
+    def __init__(self, path):
+        self.path = path
+        with open(path, 'rb') as f:
+            self.map = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        
+        magic, manifest_offset = HEADER.unpack_from(self.map)
+        if magic != MAGIC or not manifest_offset:
+            self.map.close()
+            raise ValueError(f"{os.path.basename(path)} is not a flipbook bundle")
+        self.manifest = json.loads(self.map[manifest_offset:])
+        if self.manifest.get('version') != BUNDLE_VERSION:
+            self.map.close()
+            raise ValueError(f"{os.path.basename(path)} was built by an incompatible version")
+        
+        self.pages = self.manifest['pages']
+        self.decoded = OrderedDict()  # (page_num, level) -> Image, oldest first
+    
+    def __len__(self):
+        return len(self.pages)
+    
+    def __getitem__(self, page_num):
+        return BundlePage(self, page_num)
+    
+    def close(self):
+        self.decoded.clear()
+        self.map.close()
+    
+    def page_rect(self, page_num):
+        page = self.pages[page_num]
+        return PageRect(page['width'], page['height'])
+    
+    def decode(self, entry, size=None):
+        """Decode [width, height, offset, length]; JPEGs decode at a reduced scale when size allows"""
+        offset, length = entry[2], entry[3]
+        img = Image.open(io.BytesIO(self.map[offset:offset + length]))
+        if size is not None:
+            img.draft('RGB', size)
+        return img.convert('RGB')
+    
+    def level_for(self, page_num, width):
+        """Index of the smallest pyramid level at least width pixels wide"""
+        levels = self.pages[page_num]['levels']
+        for level, entry in enumerate(levels):
+            if entry[0] >= width:
+                return level
+        return len(levels) - 1
+    
+    def level_image(self, page_num, level):
+        key = (page_num, level)
+        img = self.decoded.get(key)
+        if img is None:
+            img = self.decode(self.pages[page_num]['levels'][level])
+            self.decoded[key] = img
+            while len(self.decoded) > DECODED_LEVELS:
+                self.decoded.popitem(last=False)
+        self.decoded.move_to_end(key)
+        return img
+    
+    def fitted(self, entry, size):
+        img = self.decode(entry, size)
+        # The level is close to the requested size, and Pillow's bilinear filter antialiases when shrinking
+        return img if img.size == size else img.resize(size, Image.Resampling.BILINEAR)
+    
+    def page_image(self, page_num, size):
+        """The page resized to size = (width, height)"""
+        level = self.level_for(page_num, size[0])
+        return self.fitted(self.pages[page_num]['levels'][level], size)
+    
+    def thumbnail(self, page_num, max_width, max_height):
+        entry = self.pages[page_num]['thumb']
+        scale = min(max_width / entry[0], max_height / entry[1])
+        return self.fitted(entry, (max(1, round(entry[0] * scale)), max(1, round(entry[1] * scale))))
+    
+    def render_tile(self, page_num, scale, tile_x, tile_y, tile_size):
+        """One tile_size square of the page at scale, cut from the best level"""
+        rect = self.page_rect(page_num)
+        level = self.level_for(page_num, math.ceil(rect.width * scale))
+        source = self.level_image(page_num, level)
+        factor = source.width / rect.width / scale
+        
+        # Same clip as render_pool.render_tile, in page pixels at scale
+        left, top = tile_x * tile_size, tile_y * tile_size
+        right = min(left + tile_size, rect.width * scale)
+        bottom = min(top + tile_size, rect.height * scale)
+        size = (max(1, round(right - left)), max(1, round(bottom - top)))
+        box = (
+            left * factor,
+            top * factor,
+            min(right * factor, source.width),
+            min(bottom * factor, source.height)
+        )
+        return source.resize(size, Image.Resampling.BILINEAR, box=box)
+    
+    def search_index(self):
+        entry = self.manifest.get('search')
+        if entry is None:
+            return SearchIndex()
+        offset, length = entry
+        return SearchIndex.from_dict(json.loads(self.map[offset:offset + length]))
+
+class BundlePage:
+    """Stands in for a PDF page wherever only its size is needed"""
+    
+    def __init__(self, bundle, page_num):
+        self.bundle = bundle
+        self.number = page_num
+        self.rect = bundle.page_rect(page_num)
@@ -0,0 +1,156 @@
+"""Lightweight timing of the render and animation stages.
+
+Code wraps each stage in `with recorder.stage('name'):`. While recording
+is off that is a shared no-op context, so the hooks can stay in release
+builds. When on, the last few hundred timings per stage feed the on-canvas
+HUD, and every event can also be appended to a rolling trace file:
+CSV if the path ends in .csv, otherwise one JSON object per line.
+
+Enable with FLIPBOOK_TRACE=<path> / FLIPBOOK_HUD=1 or the --trace and
+--hud command line flags. Render worker processes only collect their
+timings, which travel back with each result and are recorded by the UI.
+"""
+import csv
+import json
+import os
+import time
+from collections import defaultdict, deque
+from contextlib import contextmanager, nullcontext
+
+WINDOW = 240  # timings kept per stage for the HUD averages
+TRACE_ROTATE_BYTES = 8 * 1024 * 1024  # trace size before rolling to <path>.1
+TRACE_FIELDS = ['time', 'kind', 'name', 'ms']
+
+class TraceWriter:
+    """Append-only trace that rolls over to a single backup when full"""
+    
+    def __init__(self, path, rotate_bytes=TRACE_ROTATE_BYTES):
+        self.path = path
+        self.rotate_bytes = rotate_bytes
+        self.as_csv = path.lower().endswith('.csv')
+        self.file = None
+        self.writer = None
+        self.open()
+    
+    def open(self):
+        directory = os.path.dirname(os.path.abspath(self.path))
+        os.makedirs(directory, exist_ok=True)
+        self.file = open(self.path, 'a', newline='')
+        if self.as_csv:
+            self.writer = csv.writer(self.file)
+            if self.file.tell() == 0:
+                self.writer.writerow(TRACE_FIELDS)
+    
+    def write(self, kind, name, ms):
+        row = [round(time.time(), 4), kind, name, round(ms, 3)]
+        if self.as_csv:
+            self.writer.writerow(row)
+        else:
+            self.file.write(json.dumps(dict(zip(TRACE_FIELDS, row))) + '\n')
+        
+        if self.file.tell() >= self.rotate_bytes:
+            self.file.close()
+            os.replace(self.path, self.path + '.1')
+            self.open()
+    
+    def close(self):
+        if self.file:
+            self.file.close()
+            self.file = None
+
+class PerfRecorder:
+    """Rolling per-stage timings, frame rate and counters"""
+    
+    def __init__(self):
+        self.enabled = False
+        self.trace = None
+        self.stages = defaultdict(lambda: deque(maxlen=WINDOW))
+        self.frame_times = deque(maxlen=WINDOW)  # perf_counter at each drawn frame
+        self.counters = defaultdict(int)
+        self.collected = None  # (stage, ms) kept for another process, see collect()
+    
+    def configure(self, enabled=True, trace_path=None):
+        self.close()
+        self.enabled = enabled or bool(trace_path)
+        if trace_path:
+            try:
+                self.trace = TraceWriter(trace_path)
+            except OSError as e:
+                print(f"Trace unavailable: {e}")
+    
+    def stage(self, name):
+        if not self.enabled:
+            return nullcontext()
+        return self._timed(name)
+    
+    @contextmanager
+    def _timed(self, name):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.record(name, (time.perf_counter() - start) * 1000)
+    
+    def collect(self):
+        """Keep timings for drain() instead of showing or tracing them here"""
+        # A forked worker inherits the trace file, which belongs to the UI process
+        self.trace = None
+        self.enabled = True
+        self.collected = deque(maxlen=WINDOW)
+    
+    def drain(self):
+        """Timings collected since the last drain, as (stage, ms) pairs"""
+        timings = list(self.collected)
+        self.collected.clear()
+        return timings
+    
+    def record(self, name, ms, kind='stage'):
+        if not self.enabled:
+            return
+        if self.collected is not None:
+            self.collected.append((name, ms))
+            return
+        self.stages[name].append(ms)
+        if self.trace:
+            self.trace.write(kind, name, ms)
+    
+    def frame(self, ms):
+        """Mark one animation frame as drawn, taking ms in total"""
+        if not self.enabled:
+            return
+        self.frame_times.append(time.perf_counter())
+        self.record('frame', ms, kind='frame')
+    
+    def count(self, name, amount=1):
+        if not self.enabled:
+            return
+        self.counters[name] += amount
+        if self.trace:
+            self.trace.write('count', name, amount)
+    
+    def fps(self, window=1.0):
+        """Frames drawn during the last window seconds"""
+        now = time.perf_counter()
+        return sum(1 for t in self.frame_times if now - t <= window) / window
+    
+    def summary(self):
+        """Mean and worst ms of every stage seen so far"""
+        return {
+            name: (sum(times) / len(times), max(times))
+            for name, times in self.stages.items() if times
+        }
+    
+    def close(self):
+        if self.trace:
+            self.trace.close()
+            self.trace = None
+
+# Shared by the viewer and render_pool; worker processes only collect
+recorder = PerfRecorder()
+
+def configure_from_env(hud=False, trace_path=None):
+    """Apply CLI settings, falling back to FLIPBOOK_HUD / FLIPBOOK_TRACE"""
+    hud = hud or os.environ.get('FLIPBOOK_HUD', '') not in ('', '0')
+    trace_path = trace_path or os.environ.get('FLIPBOOK_TRACE') or None
+    recorder.configure(hud, trace_path)
+    return hud
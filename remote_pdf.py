@@ -0,0 +1,713 @@
+"""Progressive opening of PDFs served over HTTP, using range requests.
+
+The file is mirrored into a sparse temporary file that is memory-mapped
+and handed to PyMuPDF as its buffer, so bytes fetched after opening are
+seen by the already open document. PyMuPDF cannot ask for missing bytes
+itself, so before a page is loaded its objects are located through the
+cross-reference sections and fetched first: the whole page tree, which
+MuPDF maps on the first page load, then everything the page refers to.
+Nearby objects are fetched in one request. A background thread downloads
+the rest front to back, which for linearized files is page order, and
+pages can be queued ahead of it.
+
+How soon page 1 shows depends on the file. With compressed object
+streams the page tree is a few compact ranges; in a classic file, even
+a linearized one, page dictionaries sit between the page contents, so
+reading the tree of a long document costs most of the file.
+
+Whenever the object walker meets something it does not handle, or MuPDF
+had to repair the document, the rest of the file is downloaded before
+going on, so the worst case is the old wait for the whole file.
+
+    python remote_pdf.py --serve DIR [--port 8000]   # local server with Range support, for testing
+"""
+import argparse
+import bisect
+import mmap
+import os
+import re
+import tempfile
+import threading
+import zlib
+from collections import deque
+from urllib.parse import urljoin, urlsplit
+
+BLOCK_SIZE = 64 * 1024  # granularity of the fetched-byte map
+HEAD_BYTES = 256 * 1024  # first request; linearized files have page 1 in here
+BACKGROUND_CHUNK = 1024 * 1024
+MERGE_GAP = 32 * 1024  # objects this close are fetched in one request
+TIMEOUT = 30
+MAX_REDIRECTS = 5
+
+REF = re.compile(rb'(\d+)\s+(\d+)\s+R\b')
+KIDS = re.compile(rb'/Kids\s*\[([^\]]*)\]')
+TREE_REFS = re.compile(rb'/(?:Parent|P)\s+\d+\s+\d+\s+R')  # links back into the page tree
+DEST_REFS = re.compile(rb'/(?:Dest|D)\s*\[\s*(\d+)\s+\d+\s+R')  # pages that links point at
+
+def is_url(path):
+    return path.lower().startswith(('http://', 'https://'))
+
+def url_name(url):
+    """File name part of a URL, for window titles"""
+    return os.path.basename(urlsplit(url).path) or url
+
+class LayoutError(Exception):
+    """The file uses structure the object walker does not handle"""
+
+class RangeClient:
+    """One keep-alive HTTP connection fetching byte ranges of a URL"""
+    
+    def __init__(self, url):
+        self.url = url
+        self.connection = None
+    
+    def connect(self):
+        # http.client is imported on first use; the viewer should not pay for it at startup
+        from http.client import HTTPConnection, HTTPSConnection
+        parts = urlsplit(self.url)
+        connection_class = HTTPSConnection if parts.scheme == 'https' else HTTPConnection
+        self.connection = connection_class(parts.netloc, timeout=TIMEOUT)
+        self.path = (parts.path or '/') + (f'?{parts.query}' if parts.query else '')
+    
+    def close(self):
+        if self.connection:
+            self.connection.close()
+            self.connection = None
+    
+    def get(self, start, end):
+        """(response, body) for bytes start..end-1, following redirects"""
+        for _ in range(MAX_REDIRECTS):
+            response, body = self.request(start, end)
+            if response.status not in (301, 302, 303, 307, 308):
+                return response, body
+            self.url = urljoin(self.url, response.getheader('Location'))
+            self.close()
+        raise OSError(f"Too many redirects for {self.url}")
+    
+    def request(self, start, end):
+        from http.client import HTTPException
+        # A kept-alive connection the server has dropped fails once; reconnect then
+        for attempt in range(2):
+            if self.connection is None:
+                self.connect()
+            try:
+                self.connection.request('GET', self.path, headers={'Range': f'bytes={start}-{end - 1}'})
+                response = self.connection.getresponse()
+                return response, response.read()
+            except (OSError, HTTPException):
+                self.close()
+                if attempt:
+                    raise
+    
+    def fetch(self, start, end):
+        """(offset, data) holding at least bytes start..end-1.
+        
+        Servers without range support send the whole file, at offset 0.
+        """
+        response, body = self.get(start, end)
+        if response.status == 206:
+            return content_range(response)[0], body
+        if response.status == 200:
+            return 0, body
+        raise OSError(f"HTTP {response.status} for {self.url}")
+    
+    def probe(self, length):
+        """(file size, offset, data) from a first request for up to length bytes"""
+        response, body = self.get(0, length)
+        if response.status == 206:
+            start, total = content_range(response)
+            return total, start, body
+        if response.status == 200:
+            return len(body), 0, body
+        raise OSError(f"HTTP {response.status} for {self.url}")
+
+def content_range(response):
+    """(first byte, total size) from a 206 response's Content-Range header"""
+    match = re.match(r'bytes\s+(\d+)-\d+/(\d+)', response.getheader('Content-Range') or '')
+    if not match:
+        raise OSError("Server sent no usable Content-Range")
+    return int(match.group(1)), int(match.group(2))
+
+class RangeBuffer:
+    """Sparse local copy of a remote file with a map of the blocks fetched so far"""
+    
+    def __init__(self, length):
+        self.length = length
+        if length <= 0:
+            raise OSError("Server reported an empty file")
+        fd, self.path = tempfile.mkstemp(suffix='.pdf')
+        self.file = os.fdopen(fd, 'r+b')
+        try:
+            self.file.truncate(length)
+            self.map = mmap.mmap(self.file.fileno(), length)
+        except (OSError, ValueError):
+            self.file.close()
+            os.remove(self.path)
+            raise
+        self.blocks = bytearray(-(-length // BLOCK_SIZE))  # 1 once a block is present
+        self.lock = threading.Lock()
+        self.closed = False
+    
+    def store(self, start, data):
+        end = min(start + len(data), self.length)
+        # Only blocks fully covered count as present; the file's last block may be short
+        first = -(-start // BLOCK_SIZE)
+        last = len(self.blocks) if end == self.length else end // BLOCK_SIZE
+        with self.lock:
+            if self.closed:
+                raise ValueError("range buffer is closed")
+            self.map[start:end] = data[:end - start]
+            self.blocks[first:last] = b'\x01' * max(0, last - first)
+    
+    def missing(self, start, end):
+        """Block-aligned (start, end) runs within start..end-1 not fetched yet"""
+        runs = []
+        with self.lock:
+            for block in range(start // BLOCK_SIZE, -(-min(end, self.length) // BLOCK_SIZE)):
+                if self.blocks[block]:
+                    continue
+                if runs and runs[-1][1] == block * BLOCK_SIZE:
+                    runs[-1][1] = min((block + 1) * BLOCK_SIZE, self.length)
+                else:
+                    runs.append([block * BLOCK_SIZE, min((block + 1) * BLOCK_SIZE, self.length)])
+        return runs
+    
+    def complete(self):
+        with self.lock:
+            return all(self.blocks)
+    
+    def close(self):
+        # Under the lock, so a background store() either finishes first or sees the flag
+        with self.lock:
+            self.closed = True
+            self.map.close()
+            self.file.close()
+
+class PdfLayout:
+    """Where every object lives, read from the cross-reference sections.
+    
+    Only byte ranges and references are worked out here; parsing pages is
+    left to MuPDF. Each method takes the fetch function of the calling
+    thread, which makes sure a byte range is present before it is read.
+    """
+    
+    def __init__(self, buffer, fetch):
+        self.buffer = buffer
+        self.entries = {}  # object number -> ('n', offset) or ('o', object stream number), None if free
+        self.trailer = b''
+        self.boundaries = []  # sorted offsets where objects and xref sections start
+        self.object_streams = {}  # object stream number -> {object number: source}
+        self.pages = None  # object number of each page, once the page tree is read
+        self.lock = threading.RLock()
+        self.read_xrefs(fetch)
+        
+        self.boundaries.extend(entry[1] for entry in self.entries.values() if entry and entry[0] == 'n')
+        self.boundaries.append(buffer.length)
+        self.boundaries.sort()
+        root = re.search(rb'/Root\s+(\d+)\s+\d+\s+R', self.trailer)
+        if not root:
+            raise LayoutError("no document catalog")
+        self.root = int(root.group(1))
+    
+    def read(self, start, end, fetch):
+        end = min(end, self.buffer.length)
+        fetch(start, end)
+        return bytes(self.buffer.map[start:end])
+    
+    def read_until(self, start, marker, fetch):
+        """Bytes from start up to and including marker, reading in growing windows"""
+        size = 16 * 1024
+        while True:
+            data = self.read(start, start + size, fetch)
+            found = data.find(marker)
+            if found >= 0:
+                return data[:found + len(marker)]
+            if start + size >= self.buffer.length:
+                raise LayoutError(f"{marker.decode()} not found after offset {start}")
+            size *= 4
+    
+    def read_xrefs(self, fetch):
+        tail = self.read(max(0, self.buffer.length - 1024), self.buffer.length, fetch)
+        found = re.findall(rb'startxref\s+(\d+)', tail)
+        if not found:
+            raise LayoutError("no startxref")
+        
+        # Newer sections come first and win over the ones they update
+        pending = [int(found[-1])]
+        seen = set()
+        while pending:
+            offset = pending.pop(0)
+            if offset in seen or offset >= self.buffer.length:
+                continue
+            seen.add(offset)
+            self.boundaries.append(offset)
+            pending[:0] = self.read_section(offset, fetch)
+    
+    def read_section(self, offset, fetch):
+        """Add one xref section's entries; returns the offsets of the sections it points to"""
+        start = self.read(offset, offset + 32, fetch)
+        if start.lstrip().startswith(b'xref'):
+            data = self.read_until(offset, b'startxref', fetch)
+            table, _, trailer = data.partition(b'trailer')
+            self.read_table(table.split()[1:])
+        else:
+            data = self.read_until(offset, b'endstream', fetch)
+            trailer = data[:data.find(b'stream')]
+            self.read_stream_section(data, trailer)
+        
+        if not self.trailer:
+            self.trailer = trailer
+        follow = []
+        for key in (rb'/XRefStm', rb'/Prev'):
+            match = re.search(key + rb'\s+(\d+)', trailer)
+            if match:
+                follow.append(int(match.group(1)))
+        return follow
+    
+    def read_table(self, tokens):
+        position = 0
+        while position + 1 < len(tokens):
+            first, count = int(tokens[position]), int(tokens[position + 1])
+            position += 2
+            for num in range(first, first + count):
+                offset, _, kind = tokens[position:position + 3]
+                position += 3
+                if num not in self.entries:
+                    self.entries[num] = ('n', int(offset)) if kind == b'n' else None
+    
+    def read_stream_section(self, data, header):
+        widths = re.search(rb'/W\s*\[\s*(\d+)\s+(\d+)\s+(\d+)\s*\]', header)
+        size = re.search(rb'/Size\s+(\d+)', header)
+        if not widths or not size:
+            raise LayoutError("unreadable xref stream")
+        widths = [int(w) for w in widths.groups()]
+        index = re.search(rb'/Index\s*\[([\d\s]*)\]', header)
+        ranges = [int(n) for n in index.group(1).split()] if index else [0, int(size.group(1))]
+        
+        rows = decode_stream(data, header)
+        row_size = sum(widths)
+        row = 0
+        for first, count in zip(ranges[0::2], ranges[1::2]):
+            for num in range(first, first + count):
+                fields = []
+                position = row * row_size
+                for width in widths:
+                    fields.append(int.from_bytes(rows[position:position + width], 'big') if width else None)
+                    position += width
+                row += 1
+                kind = 1 if fields[0] is None else fields[0]
+                if num in self.entries:
+                    continue
+                if kind == 1:
+                    self.entries[num] = ('n', fields[1])
+                elif kind == 2:
+                    self.entries[num] = ('o', fields[1])
+                else:
+                    self.entries[num] = None
+    
+    def span(self, offset):
+        """Byte range from offset to the start of whatever follows it"""
+        return offset, self.boundaries[bisect.bisect_right(self.boundaries, offset)]
+    
+    def source(self, num, fetch):
+        """The object's dictionary or value, without stream data; its bytes are fetched whole"""
+        entry = self.entries.get(num)
+        if entry is None:
+            return b''
+        if entry[0] == 'o':
+            return self.object_stream(entry[1], fetch).get(num, b'')
+        
+        data = self.read(*self.span(entry[1]), fetch)
+        end = data.find(b'stream')
+        return data[:end] if end >= 0 else data
+    
+    def object_stream(self, num, fetch):
+        objects = self.object_streams.get(num)
+        if objects is not None:
+            return objects
+        
+        entry = self.entries.get(num)
+        if not entry or entry[0] != 'n':
+            raise LayoutError(f"object stream {num} is not a plain object")
+        data = self.read(*self.span(entry[1]), fetch)
+        header = data[:data.find(b'stream')]
+        content = decode_stream(data, header, self.direct_length(header, fetch))
+        
+        first = int(re.search(rb'/First\s+(\d+)', header).group(1))
+        numbers = [int(n) for n in content[:first].split()]
+        starts = numbers[1::2] + [len(content) - first]
+        objects = {
+            numbers[i * 2]: content[first + starts[i]:first + starts[i + 1]]
+            for i in range(len(numbers) // 2)
+        }
+        self.object_streams[num] = objects
+        return objects
+    
+    def direct_length(self, header, fetch):
+        """Stream /Length, resolving it when it is a reference to another object"""
+        match = re.search(rb'/Length\s+(\d+)(\s+\d+\s+R)?', header)
+        if not match:
+            raise LayoutError("stream without /Length")
+        if match.group(2):
+            return int(self.source(int(match.group(1)), fetch).split(b'obj')[-1].split()[0])
+        return int(match.group(1))
+    
+    def fetch_objects(self, nums, fetch):
+        """Fetch the bytes of several objects, merging nearby ones into one request"""
+        spans = []
+        for num in nums:
+            entry = self.entries.get(num)
+            if entry is None:
+                continue
+            if entry[0] == 'o':
+                if entry[1] in self.object_streams:
+                    continue
+                entry = self.entries.get(entry[1])
+                if not entry or entry[0] != 'n':
+                    continue
+            spans.append(self.span(entry[1]))
+        
+        merged = []
+        for start, end in sorted(spans):
+            if merged and start <= merged[-1][1] + MERGE_GAP:
+                merged[-1][1] = max(merged[-1][1], end)
+            else:
+                merged.append([start, end])
+        for start, end in merged:
+            fetch(start, end)
+    
+    def load_page_tree(self, fetch):
+        """Object number of every page, in order, read a tree level at a time.
+        
+        MuPDF maps the whole page tree the first time a page is loaded, so
+        every node and page dictionary is needed up front in any case.
+        """
+        with self.lock:
+            if self.pages is not None:
+                return self.pages
+            # The catalog, and the info and encryption dictionaries MuPDF reads on opening
+            self.fetch_objects([self.root] + [int(m.group(1)) for m in REF.finditer(self.trailer)], fetch)
+            catalog = self.source(self.root, fetch)
+            root = re.search(rb'/Pages\s+(\d+)\s+\d+\s+R', catalog)
+            if not root:
+                raise LayoutError("catalog without /Pages")
+            
+            kids = {}
+            level = [int(root.group(1))]
+            while level:
+                self.fetch_objects(level, fetch)
+                next_level = []
+                for num in level:
+                    match = KIDS.search(self.source(num, fetch))
+                    if match and num not in kids:
+                        kids[num] = [int(m.group(1)) for m in REF.finditer(match.group(1))]
+                        next_level.extend(kids[num])
+                level = next_level
+            
+            pages = []
+            stack = [int(root.group(1))]
+            while stack:
+                num = stack.pop()
+                if num in kids:
+                    stack.extend(reversed(kids.pop(num)))
+                else:
+                    pages.append(num)
+            self.pages = pages
+            return pages
+    
+    def ensure_page(self, page_num, fetch):
+        """Fetch everything MuPDF reads to load and render page page_num"""
+        with self.lock:
+            pages = self.load_page_tree(fetch)
+            if page_num >= len(pages):
+                raise LayoutError("page number beyond the page tree")
+            self.closure(pages[page_num], fetch)
+    
+    def closure(self, page, fetch):
+        """Fetch the page and every object it refers to, a level of references at a time"""
+        seen = {page}
+        level = [page]
+        while level:
+            self.fetch_objects(level, fetch)
+            next_level = []
+            for num in level:
+                # The page tree is already present, and link targets only need their page number
+                source = TREE_REFS.sub(b'', self.source(num, fetch))
+                source = DEST_REFS.sub(b'[', source)
+                for match in REF.finditer(source):
+                    ref = int(match.group(1))
+                    if ref not in seen:
+                        seen.add(ref)
+                        next_level.append(ref)
+            level = next_level
+
+def decode_stream(data, header, length=None):
+    """Stream content of an object read whole; Flate with PNG predictors only"""
+    if length is None:
+        match = re.search(rb'/Length\s+(\d+)', header)
+        if not match:
+            raise LayoutError("stream without a direct /Length")
+        length = int(match.group(1))
+    start = data.find(b'stream') + len(b'stream')
+    start += 2 if data[start:start + 2] == b'\r\n' else 1
+    raw = data[start:start + length]
+    
+    filters = re.findall(rb'/(\w+Decode)\b', header)
+    if filters not in ([], [b'FlateDecode']):
+        raise LayoutError(f"unsupported stream filters {filters}")
+    content = zlib.decompress(raw) if filters else raw
+    
+    predictor = re.search(rb'/Predictor\s+(\d+)', header)
+    if predictor and int(predictor.group(1)) >= 10:
+        columns = re.search(rb'/Columns\s+(\d+)', header)
+        content = unpredict_png(content, int(columns.group(1)) if columns else 1)
+    return content
+
+def unpredict_png(data, columns):
+    """Undo the per-row PNG filters used by xref and object streams"""
+    rows = []
+    previous = bytearray(columns)
+    for position in range(0, len(data), columns + 1):
+        kind, row = data[position], bytearray(data[position + 1:position + 1 + columns])
+        for i in range(len(row)):
+            left = row[i - 1] if i else 0
+            up = previous[i]
+            up_left = previous[i - 1] if i else 0
+            if kind == 1:
+                row[i] = (row[i] + left) & 0xFF
+            elif kind == 2:
+                row[i] = (row[i] + up) & 0xFF
+            elif kind == 3:
+                row[i] = (row[i] + (left + up) // 2) & 0xFF
+            elif kind == 4:
+                estimate = left + up - up_left
+                nearest = min((abs(estimate - left), left), (abs(estimate - up), up), (abs(estimate - up_left), up_left))
+                row[i] = (row[i] + nearest[1]) & 0xFF
+        rows.append(bytes(row))
+        previous = row
+    return b''.join(rows)
+
+class DownloadStopped(Exception):
+    """The document was closed while its background download was running"""
+
+class RemoteDocument:
+    """A PDF at a URL that reads like a PyMuPDF document while it downloads.
+    
+    doc[n] fetches the page's objects before MuPDF loads it. Once
+    complete() is true, `path` is an ordinary local copy of the file.
+    """
+    
+    is_dirty = False
+    
+    def __init__(self, url):
+        import fitz
+        self.url = url
+        self.client = RangeClient(url)
+        self.buffer = None
+        self.view = None
+        self.lock = threading.Lock()  # guards layout, which either thread may give up on
+        self.ready = set()  # pages whose objects are all present
+        self.error = None  # why the background download stopped early
+        self.repaired = False  # set once the document had to be reopened from a full copy
+        self.wanted = deque()  # pages the background thread fetches before anything else
+        self.stopped = threading.Event()
+        self.downloader = None
+        
+        try:
+            length, offset, head = self.client.probe(HEAD_BYTES)
+            self.buffer = RangeBuffer(length)
+            self.path = self.buffer.path
+            self.buffer.store(offset, head)
+            
+            try:
+                self.layout = PdfLayout(self.buffer, self.fetch)
+            except (LayoutError, ValueError, zlib.error) as e:
+                print(f"Progressive loading unavailable, downloading {url_name(url)} first: {e}")
+                self.layout = None
+                self.fetch_all()
+            
+            self.ensure_page(0)
+            self.view = memoryview(self.buffer.map)
+            self.document = fitz.open(stream=self.view, filetype='pdf')
+        except BaseException:
+            # Nothing else will ever clean up after a document that failed to open
+            self.client.close()
+            if self.view is not None:
+                self.view.release()
+            if self.buffer is not None:
+                self.buffer.close()
+                self.discard()
+            raise
+        
+        self.start_download()
+    
+    def fetch(self, start, end, client=None):
+        """Make bytes start..end-1 present, downloading any missing blocks"""
+        client = client or self.client
+        for run_start, run_end in self.buffer.missing(start, end):
+            if self.stopped.is_set():
+                raise DownloadStopped()
+            if not self.buffer.missing(run_start, run_end):
+                continue  # arrived with a wider response, e.g. a server ignoring Range
+            offset, data = client.fetch(run_start, run_end)
+            self.buffer.store(offset, data)
+    
+    def fetch_all(self, client=None):
+        self.fetch(0, self.buffer.length, client)
+    
+    def complete(self):
+        return self.buffer.complete()
+    
+    def start_download(self):
+        """(Re)start the background download, e.g. after it failed"""
+        if self.downloading() or self.complete():
+            return
+        self.error = None
+        self.downloader = threading.Thread(target=self.download, daemon=True)
+        self.downloader.start()
+    
+    def downloading(self):
+        """False once the background download has finished or given up; see error"""
+        return self.downloader is not None and self.downloader.is_alive()
+    
+    def __len__(self):
+        return len(self.document)
+    
+    def __getitem__(self, page_num):
+        self.ensure_page(page_num)
+        page = self.document[page_num]
+        if self.document.is_repaired and not self.repaired:
+            # MuPDF met bytes that were not there yet and rebuilt the file from a partial copy
+            print(f"{url_name(self.url)} needed repair, downloading the rest")
+            import fitz
+            with self.lock:
+                self.layout = None
+            self.fetch_all()
+            # The repaired document would otherwise hold its MuPDF state and the view all session
+            stale = self.document
+            document = fitz.open(stream=self.view, filetype='pdf')
+            with self.lock:
+                self.document = document
+                stale.close()
+            self.repaired = True
+            page = self.document[page_num]
+        return page
+    
+    def ensure_page(self, page_num, client=None):
+        with self.lock:
+            layout = self.layout
+        if page_num in self.ready or layout is None or self.complete():
+            return
+        
+        fetch = lambda start, end: self.fetch(start, end, client)
+        try:
+            layout.ensure_page(page_num, fetch)
+            self.ready.add(page_num)
+        except (LayoutError, ValueError, zlib.error) as e:
+            if self.stopped.is_set():
+                raise DownloadStopped() from e
+            print(f"Progressive loading stopped, downloading the rest: {e}")
+            with self.lock:
+                self.layout = None
+            self.fetch_all(client)
+    
+    def prefetch(self, pages):
+        """Queue pages for the background thread, replacing the previous wish list"""
+        self.wanted.clear()
+        self.wanted.extend(pages)
+    
+    def download(self):
+        """Background thread: wanted pages first, then the rest of the file in order"""
+        from http.client import HTTPException
+        client = RangeClient(self.client.url)
+        position = 0
+        try:
+            while position < self.buffer.length:
+                try:
+                    page_num = self.wanted.popleft()
+                except IndexError:
+                    page_num = None
+                if page_num is not None:
+                    self.ensure_page(page_num, client)
+                    continue
+                end = min(position + BACKGROUND_CHUNK, self.buffer.length)
+                self.fetch(position, end, client)
+                position = end
+        except DownloadStopped:
+            pass
+        except (OSError, HTTPException, ValueError) as e:
+            # A ValueError here means the buffer was closed under a request still in flight
+            if not self.stopped.is_set():
+                self.error = e
+                print(f"Background download of {url_name(self.url)} failed: {e}")
+        finally:
+            client.close()
+    
+    def close(self):
+        """Stop downloading and close the document; the local copy stays until discard().
+        
+        The background thread is not waited for: a request in flight ends
+        with DownloadStopped, or with the closed buffer refusing its data.
+        """
+        if self.document is None:
+            return
+        self.stopped.set()
+        self.document.close()
+        self.document = None
+        self.view.release()
+        self.client.close()
+        self.buffer.close()
+    
+    def discard(self):
+        try:
+            os.remove(self.path)
+        except OSError:
+            pass
+
+def serve(directory, port):
+    """Serve directory over HTTP with Range support, standing in for a catalogue host"""
+    from functools import partial
+    from http.server import SimpleHTTPRequestHandler, ThreadingHTTPServer
+    
+    class RangeRequestHandler(SimpleHTTPRequestHandler):
+        protocol_version = 'HTTP/1.1'
+        
+        def send_head(self):
+            self.range = None
+            match = re.match(r'bytes=(\d+)-(\d*)$', self.headers.get('Range', ''))
+            path = self.translate_path(self.path)
+            if not match or not os.path.isfile(path):
+                return super().send_head()
+            
+            size = os.path.getsize(path)
+            start = int(match.group(1))
+            end = min(int(match.group(2)) if match.group(2) else size - 1, size - 1)
+            if start > end:
+                self.send_error(416)
+                return None
+            f = open(path, 'rb')
+            f.seek(start)
+            self.range = end - start + 1
+            self.send_response(206)
+            self.send_header('Content-Type', self.guess_type(path))
+            self.send_header('Content-Range', f'bytes {start}-{end}/{size}')
+            self.send_header('Content-Length', str(self.range))
+            self.send_header('Accept-Ranges', 'bytes')
+            self.end_headers()
+            return f
+        
+        def copyfile(self, source, outputfile):
+            if self.range is None:
+                return super().copyfile(source, outputfile)
+            outputfile.write(source.read(self.range))
+    
+    server = ThreadingHTTPServer(('127.0.0.1', port), partial(RangeRequestHandler, directory=directory))
+    print(f"Serving {directory} with Range support on http://127.0.0.1:{server.server_port}/")
+    return server
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Local HTTP server with Range support for testing remote opening")
+    parser.add_argument('--serve', metavar='DIR', required=True, help="directory of PDFs to serve")
+    parser.add_argument('--port', type=int, default=8000)
+    args = parser.parse_args()
+    serve(args.serve, args.port).serve_forever()
@@ -0,0 +1,75 @@
+"""In-memory LRU cache for rendered page images.
+
+Entries are bounded by an approximate byte budget rather than a count,
+because a zoomed-in page can be a hundred times larger than a thumbnail.
+"""
+import os
+from collections import OrderedDict
+
+DEFAULT_BUDGET_MB = 256
+
+def image_nbytes(img):
+    """Approximate memory held by a decoded PIL image"""
+    return img.width * img.height * len(img.getbands())
+
+def budget_from_env(var='FLIPBOOK_PAGE_CACHE_MB', default_mb=DEFAULT_BUDGET_MB):
+    try:
+        return int(float(os.environ.get(var, default_mb)) * 1024 * 1024)
+    except ValueError:
+        return default_mb * 1024 * 1024
+
+class RenderCache:
+    """LRU cache of rendered images with hit/miss/eviction counters"""
+    
+    def __init__(self, max_bytes=None):
+        self.max_bytes = max_bytes if max_bytes is not None else budget_from_env()
+        self.entries = OrderedDict()  # key -> (image, nbytes)
+        self.current_bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+    
+    def get(self, key):
+        entry = self.entries.get(key)
+        if entry is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        self.entries.move_to_end(key)
+        return entry[0]
+    
+    def __contains__(self, key):
+        return key in self.entries
+    
+    def put(self, key, img):
+        nbytes = image_nbytes(img)
+        if nbytes > self.max_bytes:
+            # Never worth evicting everything for one oversized entry
+            return
+        
+        old = self.entries.pop(key, None)
+        if old:
+            self.current_bytes -= old[1]
+        self.entries[key] = (img, nbytes)
+        self.current_bytes += nbytes
+        
+        while self.current_bytes > self.max_bytes:
+            _, (_, evicted_bytes) = self.entries.popitem(last=False)
+            self.current_bytes -= evicted_bytes
+            self.evictions += 1
+    
+    def clear(self):
+        self.entries.clear()
+        self.current_bytes = 0
+    
+    def stats(self):
+        lookups = self.hits + self.misses
+        return {
+            'entries': len(self.entries),
+            'bytes': self.current_bytes,
+            'max_bytes': self.max_bytes,
+            'hits': self.hits,
+            'misses': self.misses,
+            'evictions': self.evictions,
+            'hit_rate': self.hits / lookups if lookups else 0.0,
+        }
@@ -0,0 +1,545 @@
+"""Process pool for background PyMuPDF rendering.
+
+Every worker process opens its own copy of the document once, so pages can
+be rasterized in parallel on all cores while the Tk main thread stays free.
+Results travel back as raw RGB samples or PIL images and are handed to the
+UI by polling from the Tk event loop.
+
+PyMuPDF is imported inside the functions that need it, so importing this
+module does not slow down the viewer's startup.
+"""
+import os
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+
+from PIL import Image
+
+from page_bundle import encode_image
+from perf_trace import recorder
+from search_index import normalize_words
+
+# Optional supersampling factor for page renders, e.g. 1.5 for extra-smooth text
+try:
+    RENDER_OVERSAMPLE = max(1.0, float(os.environ.get('FLIPBOOK_RENDER_OVERSAMPLE', 1.0)))
+except ValueError:
+    RENDER_OVERSAMPLE = 1.0
+
+# Parsed pages kept per process; complex vector pages can take a few MB each
+try:
+    DISPLAY_LIST_PAGES = max(1, int(os.environ.get('FLIPBOOK_DISPLAY_LIST_PAGES', 16)))
+except ValueError:
+    DISPLAY_LIST_PAGES = 16
+
+_worker_document = None
+_worker_disk = None
+
+def _init_worker(file_path, disk=None):
+    import fitz
+    global _worker_document, _worker_disk
+    # Stage timings go back to the UI process with each result, see TimedFuture
+    recorder.collect()
+    _worker_document = fitz.open(file_path)
+    _worker_disk = disk
+
+class DisplayListCache:
+    """LRU of parsed page content, so re-rasterizing a page skips the PDF interpreter.
+    
+    A display list is recorded once per page and then replayed for the
+    thumbnail, each zoom level and every tile. Each process keeps its own,
+    for its own copy of the document.
+    """
+    
+    def __init__(self, max_pages=DISPLAY_LIST_PAGES):
+        self.max_pages = max_pages
+        self.lists = OrderedDict()  # (document id, page number) -> (document, DisplayList)
+        self.hits = 0
+        self.misses = 0
+    
+    def get(self, page):
+        key = (id(page.parent), page.number)
+        entry = self.lists.get(key)
+        # Holding the document makes a reused id() after a reopen a miss
+        if entry is None or entry[0] is not page.parent:
+            self.misses += 1
+            with recorder.stage('display_list'):
+                entry = (page.parent, page.get_displaylist())
+            self.lists[key] = entry
+            while len(self.lists) > self.max_pages:
+                self.lists.popitem(last=False)
+        else:
+            self.hits += 1
+        self.lists.move_to_end(key)
+        return entry[1]
+    
+    def clear(self):
+        self.lists.clear()
+
+display_lists = DisplayListCache()
+
+def page_pixmap(page, matrix, clip=None):
+    """Rasterize a page by replaying its cached display list"""
+    return display_lists.get(page).get_pixmap(matrix=matrix, clip=clip)
+
+def page_cache_key(page_num, zoom_level, max_width, max_height):
+    """Disk cache key for a fitted page, including the render settings"""
+    return ('page', page_num, zoom_level, max_width, max_height, RENDER_OVERSAMPLE)
+
+def thumbnail_cache_key(page_num, max_width, max_height):
+    return ('thumb', page_num, max_width, max_height)
+
+def spread_pages(page_num, total_pages):
+    """Pages shown together with page_num: the cover alone, then (1, 2), (3, 4)..."""
+    if page_num <= 0:
+        return (0,)
+    first = page_num if page_num % 2 else page_num - 1
+    return tuple(p for p in (first, first + 1) if p < total_pages)
+
+def view_key(page_num, total_pages, zoom_level, max_width, max_height, spread=False):
+    """Cache key of what is on screen: one page, or a spread as a tuple of pages"""
+    if spread:
+        return (spread_pages(page_num, total_pages), zoom_level, max_width, max_height)
+    return (page_num, zoom_level, max_width, max_height)
+
+def is_spread_key(key):
+    return isinstance(key[0], tuple)
+
+def spread_page_keys(key):
+    """Page keys of the halves of a spread, each fitted into half the width"""
+    pages, zoom_level, max_width, max_height = key
+    return [(p, zoom_level, max(1, max_width // 2), max_height) for p in pages]
+
+def view_label(key):
+    pages = key[0] if is_spread_key(key) else (key[0],)
+    return '-'.join(str(p + 1) for p in pages)
+
+def neighbour_pages(current_page, total_pages, ahead, behind, spread=False):
+    """First pages of the views after and before the current one, nearest first"""
+    if not spread:
+        pages = [current_page + i for i in range(1, ahead + 1)]
+        pages += [current_page - i for i in range(1, behind + 1)]
+        return [p for p in pages if 0 <= p < total_pages]
+    
+    pages = []
+    page_num = current_page
+    for _ in range(ahead):
+        page_num = spread_pages(page_num, total_pages)[-1] + 1
+        if page_num >= total_pages:
+            break
+        pages.append(page_num)
+    page_num = current_page
+    for _ in range(behind):
+        page_num = spread_pages(page_num, total_pages)[0] - 1
+        if page_num < 0:
+            break
+        page_num = spread_pages(page_num, total_pages)[0]
+        pages.append(page_num)
+    return pages
+
+def compose_spread(images):
+    """Paste page images side by side, vertically centred"""
+    if len(images) == 1:
+        return images[0]
+    
+    width = sum(img.width for img in images)
+    height = max(img.height for img in images)
+    spread = Image.new('RGB', (width, height), 'white')
+    x = 0
+    for img in images:
+        spread.paste(img, (x, (height - img.height) // 2))
+        x += img.width
+    return spread
+
+def fitted_scale(page_rect, zoom_level, max_width, max_height):
+    """Scale at which the page fills the canvas area, capped by the zoom level"""
+    return min(max_width / page_rect.width, max_height / page_rect.height, zoom_level * 2)
+
+def fitted_size(page_rect, zoom_level, max_width, max_height):
+    """Pixel size of a fitted page render"""
+    scale = fitted_scale(page_rect, zoom_level, max_width, max_height)
+    return max(1, round(page_rect.width * scale)), max(1, round(page_rect.height * scale))
+
+def pixmap_image(pix):
+    """PIL image of an RGB pixmap, read straight from its sample buffer.
+    
+    pix.samples would first copy every pixel into a bytes object; wrapping
+    samples_mv skips that copy. PIL still unpacks RGB into its own 4-byte
+    layout, so the image does not keep the pixmap alive.
+    """
+    return Image.frombuffer("RGB", (pix.width, pix.height), pix.samples_mv, "raw", "RGB", pix.stride, 1)
+
+def render_fitted_page(page, zoom_level, max_width, max_height, oversample=None):
+    """Rasterize a page directly at the size it will be displayed"""
+    import fitz
+    oversample = oversample or RENDER_OVERSAMPLE
+    scale = fitted_scale(page.rect, zoom_level, max_width, max_height)
+    with recorder.stage('get_pixmap'):
+        pix = page_pixmap(page, fitz.Matrix(scale * oversample, scale * oversample))
+    with recorder.stage('to_image'):
+        img = pixmap_image(pix)
+    
+    if oversample > 1:
+        # Supersampled for quality; bring it back down to screen pixels
+        size = (max(1, round(page.rect.width * scale)), max(1, round(page.rect.height * scale)))
+        with recorder.stage('resize'):
+            img = img.resize(size, Image.Resampling.LANCZOS)
+    return img
+
+def thumbnail_pixmap(page, max_width, max_height):
+    """Rasterize a page so it fits inside the thumbnail box"""
+    import fitz
+    scale = min(max_width / page.rect.width, max_height / page.rect.height)
+    with recorder.stage('thumb_pixmap'):
+        return page_pixmap(page, fitz.Matrix(scale, scale))
+
+def render_thumbnail(page, max_width, max_height):
+    pix = thumbnail_pixmap(page, max_width, max_height)
+    with recorder.stage('thumb_to_image'):
+        return pixmap_image(pix)
+
+def render_tile(page, scale, tile_x, tile_y, tile_size):
+    """Rasterize one tile_size square of the page at the given scale"""
+    import fitz
+    step = tile_size / scale
+    clip = fitz.Rect(tile_x * step, tile_y * step, (tile_x + 1) * step, (tile_y + 1) * step) & page.rect
+    pix = page_pixmap(page, fitz.Matrix(scale, scale), clip)
+    return pixmap_image(pix)
+
+def _timed_task(fn, *args):
+    """Run a task in a worker and return its result with the stage timings it took"""
+    recorder.drain()
+    result = fn(*args)
+    return result, recorder.drain()
+
+def render_tile_task(page_num, scale, tile_x, tile_y, tile_size):
+    return render_tile(_worker_document[page_num], scale, tile_x, tile_y, tile_size)
+
+def render_page_task(page_num, zoom_level, max_width, max_height):
+    key = page_cache_key(page_num, zoom_level, max_width, max_height)
+    img = _worker_disk.get(key) if _worker_disk else None
+    if img is None:
+        img = render_fitted_page(_worker_document[page_num], zoom_level, max_width, max_height)
+        if _worker_disk:
+            _worker_disk.put(key, img)
+    return img
+
+def render_thumbnail_task(page_num, max_width, max_height):
+    """Raw RGB samples of one page fitted inside max_width x max_height"""
+    key = thumbnail_cache_key(page_num, max_width, max_height)
+    img = _worker_disk.get(key) if _worker_disk else None
+    if img is not None:
+        return img.width, img.height, img.tobytes()
+    
+    pix = thumbnail_pixmap(_worker_document[page_num], max_width, max_height)
+    if _worker_disk:
+        _worker_disk.put(key, pixmap_image(pix))
+    return pix.width, pix.height, pix.samples
+
+class SpreadFuture:
+    """Future-like view of the page renders that make up one spread"""
+    
+    def __init__(self, futures):
+        self.futures = futures
+    
+    def done(self):
+        return all(f.done() for f in self.futures)
+    
+    def cancelled(self):
+        return any(f.cancelled() for f in self.futures)
+    
+    def cancel(self):
+        for future in self.futures:
+            future.cancel()
+    
+    def result(self):
+        return compose_spread([f.result() for f in self.futures])
+
+class TimedFuture:
+    """Future-like view of a _timed_task job; reading the result records the worker's stage timings"""
+    
+    def __init__(self, future):
+        self.future = future
+        self.recorded = False
+    
+    def done(self):
+        return self.future.done()
+    
+    def cancelled(self):
+        return self.future.cancelled()
+    
+    def cancel(self):
+        return self.future.cancel()
+    
+    def result(self):
+        result, timings = self.future.result()
+        if not self.recorded:
+            self.recorded = True
+            for name, ms in timings:
+                recorder.record(name, ms)
+        return result
+
+def submit_view(pool, key):
+    """Queue the render of a view key; the halves of a spread go to separate workers"""
+    if is_spread_key(key):
+        return SpreadFuture([pool.submit_timed(render_page_task, *k) for k in spread_page_keys(key)])
+    return pool.submit_timed(render_page_task, *key)
+
+def extract_words_task(first_page, last_page):
+    """Normalized words of a run of pages, in reading order"""
+    return [
+        (page_num, normalize_words(w[4] for w in _worker_document[page_num].get_text('words')))
+        for page_num in range(first_page, last_page + 1)
+    ]
+
+def render_bundle_page_task(page_num, sizes, thumb_size, image_format, quality):
+    """Everything a bundle stores for one page.
+    
+    Each level is rasterized at its own size rather than downscaled from the
+    largest, which keeps small text crisp on the smaller levels.
+    """
+    import fitz
+    page = _worker_document[page_num]
+    longest = max(page.rect.width, page.rect.height)
+    
+    encoded = []
+    for size in list(sizes) + [thumb_size]:
+        scale = size / longest
+        img = pixmap_image(page_pixmap(page, fitz.Matrix(scale, scale)))
+        encoded.append((img.width, img.height, encode_image(img, image_format, quality)))
+    
+    words = normalize_words(w[4] for w in page.get_text('words'))
+    return page.rect.width, page.rect.height, encoded[:-1], encoded[-1], words
+
+def default_worker_count():
+    # Leave one core for the UI thread
+    return max(1, (os.cpu_count() or 2) - 1)
+
+class RenderPool:
+    """Worker processes that each hold the document open.
+    
+    With a DocumentCache, workers read finished renders from disk and write
+    new ones back themselves, keeping encoding off the UI process.
+    """
+    
+    def __init__(self, file_path, disk=None, workers=None):
+        self.workers = workers or default_worker_count()
+        self.executor = ProcessPoolExecutor(
+            max_workers=self.workers,
+            initializer=_init_worker,
+            initargs=(file_path, disk)
+        )
+    
+    def submit(self, fn, *args):
+        return self.executor.submit(fn, *args)
+    
+    def submit_timed(self, fn, *args):
+        """Like submit(), with the worker's stage timings recorded here when the result is read"""
+        return TimedFuture(self.executor.submit(_timed_task, fn, *args))
+    
+    def shutdown(self):
+        self.executor.shutdown(wait=False, cancel_futures=True)
+
+class ThumbnailRenderEngine:
+    """Renders thumbnails on a process pool in caller-supplied priority order.
+    
+    Only a few jobs per worker are in flight at once, so calling
+    prioritize() again after a scroll takes effect almost immediately
+    instead of waiting behind a queue of the whole document.
+    """
+    
+    def __init__(self, pool):
+        self.pool = pool
+        self.in_flight = {}  # page_num -> Future
+        self.wanted = []
+    
+    def prioritize(self, pages, max_width, max_height):
+        """Replace the wish list; earlier pages are rendered first"""
+        self.wanted = [(p, max_width, max_height) for p in pages if p not in self.in_flight]
+        self.fill()
+    
+    def fill(self):
+        while self.wanted and len(self.in_flight) < self.pool.workers * 2:
+            page_num, max_width, max_height = self.wanted.pop(0)
+            self.in_flight[page_num] = self.pool.submit_timed(
+                render_thumbnail_task, page_num, max_width, max_height)
+    
+    def poll(self):
+        """Collect finished thumbnails as (page_num, (width, height, RGB samples) or None).
+        
+        Raw samples let the UI build its bitmap without going through PIL.
+        """
+        finished = []
+        for page_num, future in list(self.in_flight.items()):
+            if not future.done():
+                continue
+            del self.in_flight[page_num]
+            try:
+                finished.append((page_num, future.result()))
+            except Exception as e:
+                print(f"Thumbnail error on page {page_num + 1}: {e}")
+                finished.append((page_num, None))
+        
+        self.fill()
+        return finished
+    
+    def busy(self):
+        return bool(self.in_flight or self.wanted)
+    
+    def cancel(self):
+        self.wanted = []
+        for future in self.in_flight.values():
+            future.cancel()
+        self.in_flight = {}
+
+class PagePrefetcher:
+    """Renders the pages around the current one before they are asked for.
+    
+    Cache keys are view keys, (page_num, zoom_level, max_width, max_height)
+    or the same with a tuple of pages for a spread, so a finished prefetch
+    drops straight into the viewer's page cache. Spreads are prefetched as
+    whole units.
+    """
+    
+    def __init__(self, pool, cache, ahead=2, behind=1):
+        self.pool = pool
+        self.cache = cache
+        self.ahead = ahead
+        self.behind = behind
+        self.in_flight = {}  # cache key -> Future
+    
+    def update(self, current_page, total_pages, zoom_level, max_width, max_height, spread=False):
+        """Queue the neighbours of current_page and drop work no longer needed"""
+        wanted = [
+            view_key(p, total_pages, zoom_level, max_width, max_height, spread)
+            for p in neighbour_pages(current_page, total_pages, self.ahead, self.behind, spread)
+        ]
+        
+        for key in list(self.in_flight):
+            if key not in wanted:
+                self.in_flight.pop(key).cancel()
+        
+        for key in wanted:
+            if key not in self.in_flight and key not in self.cache:
+                self.in_flight[key] = submit_view(self.pool, key)
+    
+    def poll(self):
+        """Move finished renders into the cache"""
+        for key, future in list(self.in_flight.items()):
+            if future.done():
+                del self.in_flight[key]
+                self.store(key, future)
+    
+    def claim(self, key):
+        """Hand over an in-flight prefetch rather than rendering the page twice"""
+        future = self.in_flight.pop(key, None)
+        if future is None or future.cancelled():
+            return None
+        return future
+    
+    def store(self, key, future):
+        try:
+            img = future.result()
+        except Exception as e:
+            print(f"Prefetch error on page {view_label(key)}: {e}")
+            return None
+        self.cache.put(key, img)
+        return img
+    
+    def busy(self):
+        return bool(self.in_flight)
+    
+    def cancel(self):
+        for future in self.in_flight.values():
+            future.cancel()
+        self.in_flight = {}
+
+class PageRenderService:
+    """Renders the page the user asked for without blocking the UI.
+    
+    Only the latest request matters: a new one supersedes the last, whose
+    job is cancelled if it has not started yet and ignored if it has. A
+    page already being prefetched is adopted instead of rendered again.
+    """
+    
+    def __init__(self, pool, cache, prefetcher=None):
+        self.pool = pool
+        self.cache = cache
+        self.prefetcher = prefetcher
+        self.key = None
+        self.future = None
+    
+    def request(self, key):
+        if key == self.key:
+            return
+        self.cancel()
+        
+        self.key = key
+        self.future = self.prefetcher.claim(key) if self.prefetcher else None
+        if self.future is None:
+            self.future = submit_view(self.pool, key)
+    
+    def poll(self):
+        """Return (key, image) once the current request finishes, else None"""
+        if self.future is None or not self.future.done():
+            return None
+        
+        key, future = self.key, self.future
+        self.key = self.future = None
+        try:
+            img = future.result()
+        except Exception as e:
+            print(f"Render error on page {view_label(key)}: {e}")
+            return None
+        self.cache.put(key, img)
+        return key, img
+    
+    def busy(self):
+        return self.future is not None
+    
+    def cancel(self):
+        if self.future is not None:
+            self.future.cancel()
+        self.key = self.future = None
+
+class SearchIndexer:
+    """Fills a SearchIndex from the pool, a batch of pages per job"""
+    
+    BATCH_PAGES = 16
+    
+    def __init__(self, pool, index, page_count):
+        self.pool = pool
+        self.index = index
+        self.in_flight = []
+        missing = [p for p in range(page_count) if p not in index.indexed_pages]
+        self.batches = [
+            (missing[i], missing[min(i + self.BATCH_PAGES, len(missing)) - 1])
+            for i in range(0, len(missing), self.BATCH_PAGES)
+        ]
+    
+    def fill(self):
+        while self.batches and len(self.in_flight) < self.pool.workers:
+            first, last = self.batches.pop(0)
+            self.in_flight.append(self.pool.submit(extract_words_task, first, last))
+    
+    def poll(self):
+        """Add finished batches to the index; returns True if anything was added"""
+        added = False
+        for future in [f for f in self.in_flight if f.done()]:
+            self.in_flight.remove(future)
+            try:
+                for page_num, words in future.result():
+                    self.index.add_page(page_num, words)
+                added = True
+            except Exception as e:
+                print(f"Indexing error: {e}")
+        
+        self.fill()
+        return added
+    
+    def busy(self):
+        return bool(self.in_flight or self.batches)
+    
+    def cancel(self):
+        self.batches = []
+        for future in self.in_flight:
+            future.cancel()
+        self.in_flight = []
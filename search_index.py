@@ -0,0 +1,141 @@
+"""Inverted full-text index of a document's pages.
+
+Each normalized word maps to an array of word positions packed together
+with their page number into one integer, so single words, prefixes of
+the word being typed and whole phrases can be looked up without touching
+the PDF. The index is built page by page in the render workers and saved
+as JSON next to the document's cached renders.
+"""
+import bisect
+import json
+import os
+import string
+import tempfile
+from array import array
+
+INDEX_VERSION = 1
+PAGE_SHIFT = 32  # posting = page << PAGE_SHIFT | word position on the page
+INDEX_FILE = f'search_v{INDEX_VERSION}.json'
+STRIP_CHARS = string.punctuation + '“”‘’«»…–—'
+
+def normalize_words(words):
+    """Lower-case words with surrounding punctuation removed, dropping empties"""
+    normalized = []
+    for word in words:
+        word = word.strip(STRIP_CHARS).lower()
+        if word:
+            normalized.append(word)
+    return normalized
+
+class SearchIndex:
+    """Word -> (page, position) postings with prefix and phrase lookup"""
+    
+    def __init__(self):
+        self.postings = {}  # word -> array of packed (page, position) postings
+        self.indexed_pages = set()
+        self.vocabulary = None  # sorted words, rebuilt lazily after additions
+    
+    def add_page(self, page_num, words):
+        if page_num in self.indexed_pages:
+            return
+        base = page_num << PAGE_SHIFT
+        for position, word in enumerate(words):
+            entry = self.postings.get(word)
+            if entry is None:
+                entry = self.postings[word] = array('Q')
+            entry.append(base | position)
+        self.indexed_pages.add(page_num)
+        self.vocabulary = None
+    
+    def is_complete(self, page_count):
+        return len(self.indexed_pages) >= page_count
+    
+    def matching_words(self, term, prefix=False):
+        if not prefix:
+            return [term] if term in self.postings else []
+        
+        if self.vocabulary is None:
+            self.vocabulary = sorted(self.postings)
+        start = bisect.bisect_left(self.vocabulary, term)
+        end = bisect.bisect_left(self.vocabulary, term + '\uffff')
+        return self.vocabulary[start:end]
+    
+    def positions(self, term, prefix=False):
+        """Packed postings of term, or of every word starting with it"""
+        found = set()
+        for word in self.matching_words(term, prefix):
+            found.update(self.postings[word])
+        return found
+    
+    def search(self, query):
+        """Sorted pages containing the query as a phrase.
+        
+        The last word also matches as a prefix while it is still being
+        typed, i.e. unless the query ends in a space.
+        """
+        terms = normalize_words(query.split())
+        if not terms:
+            return []
+        
+        last_is_prefix = not query[-1:].isspace()
+        if len(terms) == 1:
+            pages = set()
+            for word in self.matching_words(terms[0], last_is_prefix):
+                pages.update(posting >> PAGE_SHIFT for posting in self.postings[word])
+            return sorted(pages)
+        
+        postings = [
+            (offset, self.positions(term, last_is_prefix and offset == len(terms) - 1))
+            for offset, term in enumerate(terms)
+        ]
+        
+        # Start from the rarest word, then check the others at their offsets
+        postings.sort(key=lambda item: len(item[1]))
+        anchor_offset, anchor = postings[0]
+        starts = {posting - anchor_offset for posting in anchor} if anchor_offset else anchor
+        for offset, following in postings[1:]:
+            if not starts:
+                break
+            starts = {start for start in starts if start + offset in following}
+        
+        return sorted({start >> PAGE_SHIFT for start in starts})
+    
+    def to_dict(self):
+        return {
+            'version': INDEX_VERSION,
+            'pages': sorted(self.indexed_pages),
+            'postings': {word: entry.tolist() for word, entry in self.postings.items()},
+        }
+    
+    @classmethod
+    def from_dict(cls, data):
+        """Index from to_dict() output, or an empty one if it is outdated"""
+        index = cls()
+        if data.get('version') != INDEX_VERSION:
+            return index
+        index.indexed_pages = set(data['pages'])
+        index.postings = {word: array('Q', entry) for word, entry in data['postings'].items()}
+        return index
+    
+    def save(self, path):
+        """Write atomically; called from the disk cache's writer thread"""
+        data = self.to_dict()
+        try:
+            directory = os.path.dirname(path)
+            os.makedirs(directory, exist_ok=True)
+            fd, temp_path = tempfile.mkstemp(dir=directory, suffix='.tmp')
+            with os.fdopen(fd, 'w') as f:
+                json.dump(data, f, separators=(',', ':'))
+            os.replace(temp_path, path)
+        except OSError as e:
+            print(f"Search index write error: {e}")
+    
+    @classmethod
+    def load(cls, path):
+        """Saved index at path, or an empty one if missing or outdated"""
+        try:
+            with open(path) as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            return cls()
+        return cls.from_dict(data)